@@ -22,6 +22,72 @@ MDNS_ADVERT_TIMEOUT = 5
 QUERY_API_HOST = "127.0.0.1"
 QUERY_API_PORT = 80
 
+# Number of seconds to wait for a response to each HTTP request made to the API under test
+HTTP_TIMEOUT = 10
+
+# Maximum number of idle connections kept open to each API under test for re-use while a test run is in progress
+HTTP_POOL_SIZE = 4
+
+# Maximum number of requests made at once to each host under test by the basic API tests, which are otherwise made
+# concurrently. Values above HTTP_POOL_SIZE open connections which are not re-used.
+HTTP_CONCURRENCY = 4
+
+# Number of seconds a single test may take before it is reported as failed and the test run moves on, unless the test
+# sets its own timeout. A test run as a whole is stopped once it exceeds SUITE_TIMEOUT seconds. Set either to None to
+# disable.
+TEST_TIMEOUT = 600
+SUITE_TIMEOUT = 3600
+
+# Number of test runs which may execute at once. Further runs are queued until a worker becomes free.
+JOB_WORKERS = 4
+
+# Maximum number of tests within a single test run which may execute at once. Only tests declared as read-only, or
+# as mutating separate resources, are executed in parallel.
+TEST_WORKERS = 4
+
+# Ports on which to serve the mock Registry and Node used by the IS-04 Node tests. Each port provides an isolated
+# session, so this also limits how many IS-04 Node test runs may execute at once.
+MOCK_SESSION_PORTS = [5001, 5002, 5003, 5004]
+
+# Number of completed test runs to retain for viewing via the web interface
+JOB_HISTORY = 100
+
+# Path to the SQLite database used to store test results, which allows the 'rerun' test selection to execute only
+# those tests which failed or have not been run against the current specification. Set to None to disable.
+RESULT_STORE_PATH = 'results.db'
+
+# Minimum number of seconds between updates of each specification repository. If enabled, the repositories are also
+# updated in the background at this interval while the web interface is running.
+SPEC_REFRESH_INTERVAL = 3600
+ENABLE_SPEC_REFRESH = True
+
+# Number of seconds to keep specification snapshots once they're no longer the latest commit of any branch. Must be
+# longer than any test run which may be using them.
+SPEC_SNAPSHOT_RETENTION = 86400
+
+# Path to a bundle of pre-parsed specifications created by nmos-bundle.py. Used in place of the specification
+# repositories when they can't be cloned, and to avoid parsing RAML for any commit it contains. Set to None to disable.
+SPEC_BUNDLE_PATH = 'spec_bundle.pickle'
+
+# Ways in which instances may be validated against schemas. The "compiled" backend generates Python code for draft 4
+# schemas, and falls back to jsonschema for any other schemas.
+VALIDATION_BACKENDS = ["jsonschema", "compiled"]
+
+# Default means of validating responses against schemas, which may be overridden for each test run. 'jsonschema'
+# interprets each schema as it validates, while 'compiled' generates Python code for each schema, which is much faster
+# for large responses. Use nmos-validate.py to check that both give the same results for the current specifications.
+VALIDATION_BACKEND = 'jsonschema'
+
+# Maximum number of invalid elements reported for a response containing an array. Array responses are validated one
+# element at a time as they are received, and reading stops once this many invalid elements have been found.
+MAX_SCHEMA_ERRORS = 10
+
+# Number of processes used to validate the elements of large array responses in parallel, or None for one per CPU.
+# Arrays are split into shards of VALIDATION_SHARD_SIZE elements, and those with fewer elements are validated within
+# the test process. Set to 0 to validate all responses within the test process.
+VALIDATION_PROCESSES = None
+VALIDATION_SHARD_SIZE = 1000
+
 # Path to store the specification file cache in. Relative to the base of the testing repository.
 CACHE_PATH = 'cache'
 
@@ -14,16 +14,30 @@
 
 import os
 import json
-import git
+import asyncio
+import time
 import jsonschema
+import requests
 import TestHelper
 
+from functools import wraps
+from threading import Timer, Lock
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from Specification import Specification
-from TestResult import Test
+from TestResult import Test, PREVIOUS_RESULT_NOTE
+from Config import TEST_WORKERS, TEST_TIMEOUT, SUITE_TIMEOUT, VALIDATION_BACKEND, MAX_SCHEMA_ERRORS, HTTP_CONCURRENCY
+from SpecRepos import get_spec_snapshot
+from SpecBundle import get_bundled_spec
+from SpecCache import SPEC_CACHE, load_cached_spec, save_cached_spec
+from SchemaStore import get_schema_store
+from ValidationPool import iter_array_errors
+from TrafficArchive import clear_replay_misses, get_replay_misses
 
 
 def test_depends(func):
     """ Decorator to prevent a test being executed in individual mode"""
+    @wraps(func)
     def invalid(self):
         if self.test_individual:
             test = Test("Invalid")
@@ -33,6 +47,54 @@ def test_depends(func):
     return invalid
 
 
+def test_read_only(func):
+    """Decorator to declare that a test does not change the state of the API under test, allowing it to be executed
+    in parallel with other read-only tests"""
+    func.test_mode = "read"
+    return func
+
+
+def test_mutates(*resources):
+    """Decorator to declare that a test changes the state of the named resources only. Tests which mutate different
+    resources may be executed in parallel with one another."""
+    def decorator(func):
+        func.test_mode = "write"
+        func.test_resources = set(resources)
+        return func
+    return decorator
+
+
+def test_after(*test_names):
+    """Decorator to declare tests which must have completed before this test may be executed"""
+    def decorator(func):
+        func.test_after = set(test_names)
+        return func
+    return decorator
+
+
+def test_timeout(seconds):
+    """Decorator to allow a test to take a given number of seconds before it is reported as failed, in place of
+    TEST_TIMEOUT. Tests which are bounded by other means, such as HTTP_TIMEOUT, may use None to disable the timeout."""
+    def decorator(func):
+        func.test_timeout = seconds
+        return func
+    return decorator
+
+
+def tests_conflict(test1, test2):
+    """Check whether two tests may not be executed at the same time. Tests without a declared mode conflict with
+    every other test."""
+    mode1 = getattr(test1, "test_mode", None)
+    mode2 = getattr(test2, "test_mode", None)
+    if mode1 is None or mode2 is None:
+        return True
+    if mode1 == "read" and mode2 == "read":
+        return False
+    if mode1 == "write" and mode2 == "write":
+        return len(test1.test_resources & test2.test_resources) > 0
+    return True
+
+
 class GenericTest(object):
     """
     Generic testing class.
@@ -42,9 +104,22 @@ class GenericTest(object):
         self.apis = apis
         self.file_prefix = "file:///" if os.name == "nt" else "file:"
         self.saved_entities = {}
+        self.saved_entities_lock = Lock()
         self.auto_test_count = 0
         self.test_individual = False
         self.result = list()
+        self.result_listener = None
+        self.abort_requested = False
+        self.abort_reason = None
+        self.suite_timed_out = False
+        # Names of tests which were aborted or timed out, so should be run again when re-running tests
+        self.incomplete_tests = set()
+        # Threads of tests which timed out but have not yet finished, by future, which must finish before tear down
+        self.abandoned_tests = {}
+        self.previous_results = []
+        self.validation_backend = VALIDATION_BACKEND
+        # Number of processes used to validate large arrays, or None for the number set in the Config
+        self.validation_processes = None
 
         self.omit_paths = []
         if isinstance(omit_paths, list):
@@ -53,32 +128,26 @@ class GenericTest(object):
         test = Test("Test initialisation")
 
         for api_name, api_data in self.apis.items():
-            repo = git.Repo(api_data["spec_path"])
-
-            # List remote branches and check there is a v#.#.x or v#.#-dev
-            branches = repo.git.branch('-a')
-            spec_branch = None
-            branch_names = [api_data["version"] + ".x", api_data["version"] + "-dev"]
-            for branch in branch_names:
-                if "remotes/origin/" + branch in branches:
-                    spec_branch = branch
-                    break
-
-            if not spec_branch:
-                raise Exception("No branch matching the expected patterns was found in the Git repository")
-
-            repo.git.reset('--hard')
-            repo.git.checkout(spec_branch)
-            repo.git.rebase("origin/" + spec_branch)
-
-        self.parse_RAML()
+            # Use the snapshot of the specification branch matching the API version under test
+            api_data["spec_commit"], api_data["spec_path"] = get_spec_snapshot(api_data["spec_key"],
+                                                                               api_data["version"])
+            self.parse_RAML(api_name)
 
         self.result.append(test.NA(""))
 
-    def parse_RAML(self):
-        """Create a Specification object for each API defined in this object"""
-        for api in self.apis:
-            self.apis[api]["spec"] = Specification(os.path.join(self.apis[api]["spec_path"] + '/APIs/' + self.apis[api]["raml"]))
+    def parse_RAML(self, api):
+        """Create a Specification object for the given API, re-using any already parsed from the same commit by this
+        process, saved in the bundle or cached on disk"""
+        raml_path = os.path.join(self.apis[api]["spec_path"] + '/APIs/' + self.apis[api]["raml"])
+        spec_key = (raml_path, self.apis[api]["spec_commit"])
+        if spec_key not in SPEC_CACHE:
+            spec_args = (self.apis[api]["spec_key"], self.apis[api]["spec_commit"], self.apis[api]["raml"])
+            spec = get_bundled_spec(*spec_args) or load_cached_spec(*spec_args)
+            if not spec:
+                spec = Specification(raml_path)
+                save_cached_spec(*spec_args, spec)
+            SPEC_CACHE[spec_key] = spec
+        self.apis[api]["spec"] = SPEC_CACHE[spec_key]
 
     def execute_tests(self, test_name):
         """Perform all tests defined within this class"""
@@ -88,21 +157,180 @@ class GenericTest(object):
             print(" * Running basic API tests")
             self.result += self.basics()
 
+        if self.abort_requested:
+            return
+
         # Run manually defined tests
         if test_name == "all":
+            method_names = []
             for method_name in dir(self):
                 if method_name.startswith("test_"):
                     method = getattr(self, method_name)
                     if callable(method):
-                        print(" * Running " + method_name)
-                        self.result.append(method())
+                        method_names.append(method_name)
+            self.result += self.schedule_tests(method_names)
+
+        # Re-run only those tests which failed or have no previous result, re-using the others
+        if test_name == "rerun":
+            self.rerun_tests()
 
         # Run a single test
-        if test_name != "auto" and test_name != "all":
+        if test_name not in ["auto", "all", "rerun"]:
             method = getattr(self, test_name)
             if callable(method):
-                print(" * Running " + test_name)
-                self.result.append(method())
+                self.result += self.schedule_tests([test_name])
+
+    def rerun_tests(self):
+        """Perform tests which failed or have not been run according to previous_results, merging in the previous
+        result of every other test"""
+        auto_results = [result for result in self.previous_results if result[3].startswith("auto_")]
+        previous = {result[3]: result for result in self.previous_results if not result[3].startswith("auto_")}
+
+        if len(auto_results) == 0 or "Fail" in [result[1] for result in auto_results]:
+            print(" * Running basic API tests")
+            self.result += self.basics()
+        else:
+            for result in auto_results:
+                self.result.append(self.notify_result(self._previous_result(result)))
+
+        if self.abort_requested:
+            return
+
+        method_names = [x for x in dir(self) if x.startswith("test_") and callable(getattr(self, x))]
+        rerun_names = [x for x in method_names if x not in previous or previous[x][1] == "Fail"]
+        rerun_results = dict(zip(rerun_names, self.schedule_tests(rerun_names)))
+        for method_name in method_names:
+            if method_name in rerun_results:
+                self.result.append(rerun_results[method_name])
+            else:
+                self.result.append(self.notify_result(self._previous_result(previous[method_name])))
+
+    def _previous_result(self, result):
+        """Mark a result as having been carried over from a previous test run"""
+        detail = "{} {}".format(PREVIOUS_RESULT_NOTE, result[2]).strip()
+        return [result[0], result[1], detail, result[3], result[4]]
+
+    def schedule_tests(self, method_names):
+        """Execute tests in parallel where their declared modes and dependencies allow, returning results in the
+        order the tests were given. A test is only started once every earlier test it conflicts with has completed,
+        so results match those of executing the tests one at a time. Tests which exceed their timeout, or are still
+        running when the suite watchdog fires, are reported as failed and abandoned. An abandoned test can't be
+        interrupted, so tests which conflict with it aren't started until it has finished."""
+        methods = [getattr(self, method_name) for method_name in method_names]
+        results = [None] * len(methods)
+        pending = list(range(len(methods)))
+        running = {}
+        abandoned = {}
+        started = {}
+
+        def execute(index):
+            started[index] = time.time()
+            return self._execute_replayable(methods[index])
+
+        executor = ThreadPoolExecutor(max_workers=TEST_WORKERS)
+        try:
+            while len(pending) > 0 or len(running) > 0:
+                if self.abort_requested:
+                    for index in pending:
+                        test = Test(self._test_description(methods[index]), method_names[index])
+                        self.incomplete_tests.add(method_names[index])
+                        results[index] = self.notify_result(test.NA(self.abort_reason))
+                    pending = []
+                    if self.suite_timed_out:
+                        # Don't wait for tests which are still running once the suite has overrun
+                        for index in running.values():
+                            results[index] = self._overdue_result(methods[index], method_names[index],
+                                                                  started.get(index), self.abort_reason)
+                        abandoned.update(running)
+                        running = {}
+                    if len(running) == 0:
+                        break
+
+                for index in list(pending):
+                    if self._can_start(index, methods, method_names, pending, running, abandoned):
+                        print(" * Running " + method_names[index])
+                        running[executor.submit(execute, index)] = index
+                        pending.remove(index)
+
+                if len(running) == 0 and len(abandoned) == 0 and len(pending) > 0:
+                    # Dependencies can't be satisfied (e.g. a cycle), so fall back to executing in order
+                    index = pending.pop(0)
+                    print(" * Running " + method_names[index])
+                    running[executor.submit(execute, index)] = index
+
+                # Wake at least once a second to notice aborts and the suite watchdog
+                done, _ = wait(list(running) + list(abandoned), timeout=1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in running:
+                        results[running.pop(future)] = self.notify_result(future.result())
+                    else:
+                        print(" * Abandoned test {} has finished".format(method_names[abandoned.pop(future)]))
+
+                for future, index in list(running.items()):
+                    timeout = getattr(methods[index], "test_timeout", TEST_TIMEOUT)
+                    if timeout is not None and index in started and time.time() - started[index] > timeout:
+                        print(" * ERROR: {} did not complete within {}s".format(method_names[index], timeout))
+                        abandoned[future] = running.pop(future)
+                        results[index] = self._overdue_result(methods[index], method_names[index], started[index],
+                                                              "Test did not complete within {}s".format(timeout))
+        finally:
+            # Threads executing abandoned tests can't be interrupted, so are left to finish in the background
+            executor.shutdown(wait=False)
+            self.abandoned_tests.update({future: method_names[index] for future, index in abandoned.items()})
+
+        return results
+
+    def _execute_replayable(self, function, *args):
+        """Execute a test or check, reporting it as N/A if it made a request which couldn't be answered by the traffic
+        archive being replayed"""
+        clear_replay_misses()
+        result = function(*args)
+        misses = get_replay_misses()
+        if misses and result is not None:
+            # The device's response to a request which wasn't recorded is unknown, so the test can't be judged
+            return [result[0], "N/A", "Not tested. No response to {} was recorded in the traffic archive"
+                    .format(misses[0]), result[3], result[4]]
+        return result
+
+    def _overdue_result(self, method, method_name, started, reason):
+        """Report a test which is still running as failed, timed from when it started"""
+        self.incomplete_tests.add(method_name)
+        test = Test(self._test_description(method), method_name)
+        if started:
+            test.timer = started
+        return self.notify_result(test.FAIL(reason))
+
+    def _test_description(self, method):
+        """Get a description of a test from the first line of its docstring"""
+        if method.__doc__:
+            return method.__doc__.strip().split("\n")[0]
+        return method.__name__
+
+    def _can_start(self, index, methods, method_names, pending, running, abandoned):
+        """Check whether the test at a given index may be started alongside those already running, including those
+        which have been abandoned"""
+        method = methods[index]
+        for other in list(running.values()) + list(abandoned.values()):
+            if tests_conflict(method, methods[other]):
+                return False
+        for other in pending:
+            if other >= index:
+                break
+            if tests_conflict(method, methods[other]):
+                return False
+        unfinished = [method_names[other] for other in pending + list(running.values())]
+        for test_name in getattr(method, "test_after", []):
+            if test_name in unfinished:
+                return False
+        return True
+
+    def _wait_for_abandoned_tests(self):
+        """Wait for the threads of tests which were abandoned to finish"""
+        if len(self.abandoned_tests) > 0:
+            print(" * Waiting for {} abandoned test(s) to finish: {}".format(
+                len(self.abandoned_tests), ", ".join(sorted(self.abandoned_tests.values()))))
+            wait(self.abandoned_tests)
+            self.abandoned_tests = {}
 
     def set_up_tests(self):
         """Called before a set of tests is run. Override this method with setup code."""
@@ -114,23 +342,77 @@ class GenericTest(object):
 
     def run_tests(self, test_name="all"):
         """Perform tests and return the results as a list"""
-        self.test_individual = (test_name != "all")
-
-        # Set up
-        test = Test("Test setup")
-        self.set_up_tests()
-        self.result.append(test.NA(""))
+        self.test_individual = (test_name not in ["all", "rerun"])
 
-        # Run tests
-        self.execute_tests(test_name)
+        # Pass on any results gathered during initialisation
+        for result in self.result:
+            self.notify_result(result)
 
-        # Tear down
-        test = Test("Test teardown")
-        self.tear_down_tests()
-        self.result.append(test.NA(""))
+        # Connections to the APIs under test are re-used until the tests have finished
+        base_urls = [api["base_url"] for api in self.apis.values()]
+        TestHelper.open_sessions(base_urls)
+        try:
+            # Set up
+            test = Test("Test setup")
+            self.set_up_tests()
+            self.result.append(self.notify_result(test.NA("")))
+
+            # Run tests, stopping any which are still running if the suite as a whole overruns
+            watchdog = None
+            if SUITE_TIMEOUT is not None:
+                watchdog = Timer(SUITE_TIMEOUT, self._suite_timeout)
+                watchdog.daemon = True
+                watchdog.start()
+            try:
+                self.execute_tests(test_name)
+            finally:
+                if watchdog:
+                    watchdog.cancel()
+
+            # Tear down, once no test is still changing the state of the API under test
+            self._wait_for_abandoned_tests()
+            test = Test("Test teardown")
+            self.tear_down_tests()
+            self.result.append(self.notify_result(test.NA("")))
+        finally:
+            TestHelper.close_sessions(base_urls)
 
         return self.result
 
+    def notify_result(self, result):
+        """Pass a test result to the result listener, if any, as soon as it is available"""
+        if self.result_listener:
+            self.result_listener(result)
+        return result
+
+    def abort(self, reason="Test run was aborted"):
+        """Request that a test run stops as soon as possible. Tests which have not yet started are reported as N/A."""
+        if not self.abort_requested:
+            self.abort_reason = reason
+        self.abort_requested = True
+
+    def _suite_timeout(self):
+        print(" * ERROR: Test run did not complete within {}s".format(SUITE_TIMEOUT))
+        self.suite_timed_out = True
+        self.abort("Test run did not complete within {}s".format(SUITE_TIMEOUT))
+
+    def expected_result_count(self, test_name="all"):
+        """Estimate the number of results which run_tests will produce, for progress reporting"""
+        count = 3  # Initialisation, set up and tear down
+        if test_name in ["auto", "all", "rerun"]:
+            for api in self.apis:
+                count += 2
+                for resource in self.apis[api]["spec"].get_reads():
+                    params = resource[1]['params']
+                    if 200 in resource[1]['responses'] and resource[0] not in self.omit_paths and \
+                            (not params or len(params) == 1):
+                        count += 1
+        if test_name in ["all", "rerun"]:
+            count += len([x for x in dir(self) if x.startswith("test_") and callable(getattr(self, x))])
+        elif test_name != "auto":
+            count += 1
+        return count
+
     def convert_bytes(self, data):
         """Convert bytes which may be contained within a dict or tuple into strings"""
         if isinstance(data, bytes):
@@ -170,9 +452,9 @@ class GenericTest(object):
         self.auto_test_count += 1
         return "auto_" + str(self.auto_test_count)
 
-    def check_base_path(self, base_url, path, expectation):
+    def check_base_path(self, base_url, path, expectation, test_name=None):
         """Check that a GET to a path returns a JSON array containing a defined string"""
-        test = Test("GET {}".format(path), self.auto_test_name())
+        test = Test("GET {}".format(path), test_name or self.auto_test_name())
         valid, req = self.do_request("GET", base_url + path)
         if not valid:
             return test.FAIL("Unable to connect to API: {}".format(req))
@@ -196,10 +478,7 @@ class GenericTest(object):
             return False, "Incorrect CORS headers: {}".format(response.headers)
 
         try:
-            resolver = jsonschema.RefResolver(self.file_prefix + os.path.join(self.apis[api_name]["spec_path"] +
-                                                                              '/APIs/schemas/'),
-                                              schema)
-            jsonschema.validate(response.json(), schema, resolver=resolver)
+            self.get_validator(api_name, schema).validate(response.json())
         except jsonschema.ValidationError:
             return False, "Response schema validation error"
         except json.decoder.JSONDecodeError:
@@ -207,33 +486,129 @@ class GenericTest(object):
 
         return True, ""
 
-    def do_request(self, method, url, data=None):
-        return TestHelper.do_request(method, url, data)
+    def check_response_stream(self, api_name, item_schema, method, response):
+        """Confirm that each element of a streamed Requests response containing an array conforms to the expected
+        schema, reading one element at a time. Returns the IDs of any sub-resources found along with the result."""
+        subresources = []
+        if not self.validate_CORS(method, response):
+            return False, "Incorrect CORS headers: {}".format(response.headers), subresources
+
+        def entries():
+            for entry in TestHelper.iter_json_array(response):
+                subresource = self.get_subresource_id(entry)
+                if subresource:
+                    subresources.append(subresource)
+                yield entry
+
+        validator = self.get_validator(api_name, item_schema)
+        schema_dir = self.apis[api_name]["spec_path"] + '/APIs/schemas/'
+        errors = []
+        try:
+            # Large arrays are validated in parallel by other processes
+            for index, path, message in iter_array_errors(entries(), validator, schema_dir, item_schema,
+                                                          self.validation_backend, self.validation_processes):
+                location = "".join("[{!r}]".format(part) for part in [index] + path)
+                errors.append("{}: {}".format(location, message))
+                if len(errors) == MAX_SCHEMA_ERRORS:
+                    break
+        except (json.decoder.JSONDecodeError, UnicodeDecodeError):
+            return False, "Invalid JSON received", subresources
+        except TestHelper.NotAnArray:
+            return False, "Response schema validation error: response is not an array", subresources
+        except requests.exceptions.RequestException as e:
+            # The body is read while validating, so errors such as read timeouts are only found here
+            return False, "Unable to read response: {}".format(e), subresources
+
+        if errors:
+            return False, "Response schema validation error in {}{} element(s): {}".format(
+                "at least " if len(errors) == MAX_SCHEMA_ERRORS else "", len(errors), "; ".join(errors)), subresources
+        return True, "", subresources
+
+    def do_request(self, method, url, data=None, stream=False):
+        return TestHelper.do_request(method, url, data, stream=stream)
 
     def basics(self):
-        """Perform basic API read requests (GET etc.) relevant to all API definitions"""
-        results = []
-
+        """Perform basic API read requests (GET etc.) relevant to all API definitions. Requests are made concurrently,
+        up to HTTP_CONCURRENCY at a time to each host, except that parameterised URLs are only requested once the
+        lists which provide their parameters have been read. Results are returned in the order of the requests."""
+        checks = []
         for api in self.apis:
+            base_url = self.apis[api]["base_url"]
+            host = urlsplit(base_url).netloc
+
             # This test isn't mandatory... Many systems will use the base path for other things
-            # results.append(self.check_base_path(self.apis[api]["base_url"], "/", "x-nmos/"))
+            # checks.append((host, None, self.check_base_path, (base_url, "/", "x-nmos/", self.auto_test_name())))
 
-            results.append(self.check_base_path(self.apis[api]["base_url"], "/x-nmos", api + "/"))
-            results.append(self.check_base_path(self.apis[api]["base_url"], "/x-nmos/{}".format(api),
-                                                self.apis[api]["version"] + "/"))
+            checks.append((host, None, self.check_base_path, (base_url, "/x-nmos", api + "/",
+                                                              self.auto_test_name())))
+            checks.append((host, None, self.check_base_path, (base_url, "/x-nmos/{}".format(api),
+                                                              self.apis[api]["version"] + "/",
+                                                              self.auto_test_name())))
 
             for resource in self.apis[api]["spec"].get_reads():
+                params = resource[1]['params']
+                if params and len(params) > 1:
+                    continue
                 for response_code in resource[1]['responses']:
                     if response_code == 200 and resource[0] not in self.omit_paths:
                         # TODO: Test for each of these if the trailing slash version also works and if redirects are
                         # used on either.
-                        result = self.check_api_resource(resource, response_code, api)
-                        if result is not None:
-                            results.append(result)
-
+                        checks.append((host, resource, self.check_api_resource, (resource, response_code, api,
+                                                                                 self.auto_test_name())))
+
+        return asyncio.run(self._run_checks(checks))
+
+    async def _run_checks(self, checks):
+        """Execute checks given as (host, resource, function, args) concurrently, returning their results in order.
+        A check of a parameterised resource waits for earlier checks of the list providing its parameter, and checks
+        of such a list are executed in order, so that the saved entities used are the same as for sequential
+        execution."""
+        parents = set()
+        for host, resource, function, args in checks:
+            if resource and resource[1]['params']:
+                parents.add(resource[0].split("{")[0].rstrip("/"))
+
+        def dependencies(index):
+            resource = checks[index][1]
+            if not resource:
+                return []
+            if resource[1]['params']:
+                path = resource[0].split("{")[0].rstrip("/")
+            elif resource[0] in parents:
+                path = resource[0]
+            else:
+                return []
+            return [other for other in range(index) if checks[other][1] and checks[other][1][0] == path]
+
+        loop = asyncio.get_running_loop()
+        limits = {host: asyncio.Semaphore(HTTP_CONCURRENCY) for host, resource, function, args in checks}
+        executor = ThreadPoolExecutor(max_workers=HTTP_CONCURRENCY * max(len(limits), 1))
+
+        async def execute(index):
+            host, resource, function, args = checks[index]
+            for other in dependencies(index):
+                await tasks[other]
+            async with limits[host]:
+                if self.abort_requested:
+                    # The test name is always the last argument
+                    self.incomplete_tests.add(args[-1])
+                    return None
+                return await loop.run_in_executor(executor, self._execute_replayable, function, *args)
+
+        tasks = [asyncio.ensure_future(execute(index)) for index in range(len(checks))]
+        results = []
+        try:
+            # Results are passed on in order, each as soon as it and every earlier result is available
+            for task in tasks:
+                result = await task
+                if result is not None:
+                    results.append(self.notify_result(result))
+        finally:
+            # Requests which are already in progress can't be interrupted, so are left to finish in the background
+            executor.shutdown(wait=False)
         return results
 
-    def check_api_resource(self, resource, response_code, api):
+    def check_api_resource(self, resource, response_code, api, test_name=None):
         # Test URLs which include a {resourceId} or similar parameter
         if resource[1]['params'] and len(resource[1]['params']) == 1:
             path = resource[0].split("{")[0].rstrip("/")
@@ -246,13 +621,13 @@ class GenericTest(object):
                 test = Test("{} /x-nmos/{}/{}{}".format(resource[1]['method'].upper(),
                                                         api,
                                                         self.apis[api]["version"],
-                                                        url_param), self.auto_test_name())
+                                                        url_param), test_name or self.auto_test_name())
             else:
                 # There were no saved entities found, so we can't test this parameterised URL
                 test = Test("{} /x-nmos/{}/{}{}".format(resource[1]['method'].upper(),
                                                         api,
                                                         self.apis[api]["version"],
-                                                        resource[0].rstrip("/")), self.auto_test_name())
+                                                        resource[0].rstrip("/")), test_name or self.auto_test_name())
                 return test.NA("No resources found to perform this test")
 
         # Test general URLs with no parameters
@@ -261,10 +636,17 @@ class GenericTest(object):
             test = Test("{} /x-nmos/{}/{}{}".format(resource[1]['method'].upper(),
                                                     api,
                                                     self.apis[api]["version"],
-                                                    resource[0].rstrip("/")), self.auto_test_name())
+                                                    resource[0].rstrip("/")), test_name or self.auto_test_name())
         else:
             return None
 
+        # Arrays such as lists of resources are checked one element at a time as they are received
+        if resource[1]['method'].upper() == "GET":
+            schema = self.get_schema(api, resource[1]["method"], resource[0], response_code)
+            item_schema = self.apis[api]["spec"].get_item_schema(schema) if schema else None
+            if item_schema:
+                return self.check_api_resource_stream(test, resource, response_code, api, url, item_schema)
+
         status, response = self.do_request(resource[1]['method'], url)
         if not status:
             return test.FAIL(response)
@@ -297,33 +679,70 @@ class GenericTest(object):
         else:
             return test.FAIL(message)
 
+    def check_api_resource_stream(self, test, resource, response_code, api, url, item_schema):
+        """Check a resource returning an array without holding the whole response in memory"""
+        status, response = self.do_request(resource[1]['method'], url, stream=True)
+        if not status:
+            return test.FAIL(response)
+
+        try:
+            if response.status_code != response_code:
+                return test.FAIL("Incorrect response code: {}".format(response.status_code))
+
+            valid, message, subresources = self.check_response_stream(api, item_schema, resource[1]["method"],
+                                                                      response)
+        finally:
+            response.close()
+
+        # Gather IDs of sub-resources for testing of parameterised URLs...
+        self.add_subresources(resource[0], subresources)
+
+        if valid:
+            return test.PASS()
+        else:
+            return test.FAIL(message)
+
+    def get_subresource_id(self, entry):
+        """Get the ID of a sub-resource from an entry in an array JSON response, or None if it doesn't identify one"""
+        # In general, lists return fully fledged objects which each have an ID
+        if isinstance(entry, dict) and "id" in entry:
+            return entry["id"]
+        # In some cases lists contain strings which indicate the path to each resource
+        elif isinstance(entry, str) and entry.endswith("/"):
+            return entry.rstrip("/")
+        return None
+
     def save_subresources(self, path, response):
         """Get IDs contained within an array JSON response such that they can be interrogated individually"""
         subresources = list()
         try:
             if isinstance(response.json(), list):
                 for entry in response.json():
-                    # In general, lists return fully fledged objects which each have an ID
-                    if isinstance(entry, dict) and "id" in entry:
-                        subresources.append(entry["id"])
-                    # In some cases lists contain strings which indicate the path to each resource
-                    elif isinstance(entry, str) and entry.endswith("/"):
-                        res_id = entry.rstrip("/")
-                        subresources.append(res_id)
+                    subresource = self.get_subresource_id(entry)
+                    if subresource:
+                        subresources.append(subresource)
         except json.decoder.JSONDecodeError:
             pass
 
+        self.add_subresources(path, subresources)
+
+    def add_subresources(self, path, subresources):
+        """Record IDs of sub-resources such that they can be interrogated individually"""
         if len(subresources) > 0:
-            if path not in self.saved_entities:
-                self.saved_entities[path] = subresources
-            else:
-                self.saved_entities[path] += subresources
+            with self.saved_entities_lock:
+                if path not in self.saved_entities:
+                    self.saved_entities[path] = subresources
+                else:
+                    self.saved_entities[path] += subresources
 
     def load_schema(self, api_name, path):
-        """Used to load in schemas"""
-        real_path = os.path.join(self.apis[api_name]["spec_path"] + '/APIs/schemas/', path)
-        f = open(real_path, "r")
-        return json.loads(f.read())
+        """Used to load in schemas. The schema returned is shared, so must be copied before being modified."""
+        return get_schema_store(self.apis[api_name]["spec_path"] + '/APIs/schemas/').load(path)
 
     def get_schema(self, api_name, method, path, status_code):
         return self.apis[api_name]["spec"].get_schema(method, path, status_code)
+
+    def get_validator(self, api_name, schema, validator_class=None):
+        """Get a validator for a schema, which is re-used if the schema came from get_schema"""
+        return self.apis[api_name]["spec"].get_validator(schema, self.apis[api_name]["spec_path"] + '/APIs/schemas/',
+                                                         validator_class, self.validation_backend)
@@ -19,7 +19,9 @@ import time
 import socket
 import netifaces
 import json
+import TestHelper
 
+from urllib.parse import urlparse
 from zeroconf_monkey import ServiceBrowser, ServiceInfo, Zeroconf
 from MdnsListener import MdnsListener
 from TestResult import Test
@@ -43,7 +45,8 @@ class IS0401Test(GenericTest):
         self.is04_utils = IS04Utils(self.node_url)
 
     def set_up_tests(self):
-        self.registry.enable()
+        # Only accept registrations from the Node under test, as other sessions may be advertising registries too
+        self.registry.enable(urlparse(self.node_url).hostname)
         self.zc = Zeroconf()
         self.zc_listener = MdnsListener(self.zc)
 
@@ -67,8 +70,8 @@ class IS0401Test(GenericTest):
         # TODO: Add another test which checks support for parsing CSV string in api_ver
         txt = {'api_ver': self.apis[NODE_API_KEY]["version"], 'api_proto': 'http', 'pri': '0'}
         info = ServiceInfo("_nmos-registration._tcp.local.",
-                           "NMOS Test Suite._nmos-registration._tcp.local.",
-                           socket.inet_aton(default_ip), 5000, 0, 0,
+                           "NMOS Test Suite {}._nmos-registration._tcp.local.".format(self.registry.port),
+                           socket.inet_aton(default_ip), self.registry.port, 0, 0,
                            txt, "nmos-test.local.")
 
         self.zc.register_service(info)
@@ -154,7 +157,7 @@ class IS0401Test(GenericTest):
             url = "http://" + QUERY_API_HOST + ":" + str(QUERY_API_PORT) + "/x-nmos/query/" + \
                   self.apis[NODE_API_KEY]["version"] + "/" + res_type + "s/" + res_id
             try:
-                r = requests.get(url)
+                r = TestHelper.request("GET", url)
                 if r.status_code == 200:
                     found_resource = r.json()
                 else:
@@ -180,7 +183,7 @@ class IS0401Test(GenericTest):
             url = "{}{}s".format(self.node_url, res_type)
         try:
             # Get data from node itself
-            r = requests.get(url)
+            r = TestHelper.request("GET", url)
             if r.status_code == 200:
                 try:
                     node_resources = self.get_node_resources(r.json())
@@ -201,6 +204,8 @@ class IS0401Test(GenericTest):
                     return test.FAIL("Invalid JSON received!")
             else:
                 return test.FAIL("Could not reach Node!")
+        except requests.exceptions.Timeout:
+            return test.FAIL("Connection timeout for {}".format(url))
         except requests.ConnectionError:
             return test.FAIL("Connection error for {}".format(url))
 
@@ -15,6 +15,7 @@
 # limitations under the License.
 
 
+import copy
 import requests
 import uuid
 import os
@@ -22,7 +23,7 @@ from jsonschema import ValidationError, SchemaError, RefResolver, Draft4Validato
 
 import TestHelper
 from TestResult import Test
-from GenericTest import GenericTest
+from GenericTest import GenericTest, test_read_only, test_mutates, test_timeout
 from IS05Utils import IS05Utils
 
 CONN_API_KEY = "connection"
@@ -44,6 +45,7 @@ class IS0501Test(GenericTest):
         self.senders = self.is05_utils.get_senders()
         self.receivers = self.is05_utils.get_receivers()
 
+    @test_read_only
     def test_01(self):
         """Api root matches the spec"""
         test = Test("Api root matches the spec")
@@ -60,6 +62,7 @@ class IS0501Test(GenericTest):
         else:
             return test.FAIL(result)
 
+    @test_read_only
     def test_02(self):
         """Single endpoint root matches the spec"""
         test = Test("Single endpoint root matches the spec")
@@ -76,6 +79,7 @@ class IS0501Test(GenericTest):
         else:
             return test.FAIL(result)
 
+    @test_read_only
     def test_03(self):
         """Root of /single/senders/ matches the spec"""
         test = Test("Root of /single/senders/ matches the spec")
@@ -105,6 +109,7 @@ class IS0501Test(GenericTest):
         else:
             return test.FAIL(response)
 
+    @test_read_only
     def test_04(self):
         """Root of /single/receivers/ matches the spec"""
         test = Test("Root of /single/receivers/ matches the spec")
@@ -134,6 +139,7 @@ class IS0501Test(GenericTest):
         else:
             return test.FAIL(response)
 
+    @test_read_only
     def test_05(self):
         """Index of /single/senders/<uuid>/ matches the spec"""
         test = Test("Index of /single/senders/<uuid>/ matches the spec")
@@ -159,6 +165,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_read_only
     def test_06(self):
         """Index of /single/receivers/<uuid>/ matches the spec"""
         test = Test("Index of /single/receivers/<uuid>/ matches the spec")
@@ -183,6 +190,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_read_only
     def test_07(self):
         """Return of /single/senders/<uuid>/constraints/ meets the schema"""
         test = Test("Return of /single/senders/<uuid>/constraints/ meets the schema")
@@ -199,6 +207,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_read_only
     def test_08(self):
         """Return of /single/receivers/<uuid>/constraints/ meets the schema"""
         test = Test("Return of /single/receivers/<uuid>/constraints/ meets the schema")
@@ -215,6 +224,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_read_only
     def test_09(self):
         """All params listed in /single/senders/<uuid>/constraints/ matches /staged/ and /active/"""
         test = Test("All params listed in /single/senders/<uuid>/constraints/ matches /staged/ and /active/")
@@ -230,6 +240,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_read_only
     def test_10(self):
         """All params listed in /single/receivers/<uuid>/constraints/ matches /staged/ and /active/"""
         test = Test("All params listed in /single/receivers/<uuid>/constraints/ matches /staged/ and /active/")
@@ -245,6 +256,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_read_only
     def test_11(self):
         """Senders are using valid combination of parameters"""
         test = Test("Senders are using valid combination of parameters")
@@ -289,6 +301,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_read_only
     def test_12(self):
         """Receiver are using valid combination of parameters"""
         test = Test("Receiver are using valid combination of parameters")
@@ -331,6 +344,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_read_only
     def test_13(self):
         """Return of /single/senders/<uuid>/staged/ meets the schema"""
         test = Test("Return of /single/senders/<uuid>/staged/ meets the schema")
@@ -347,6 +361,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_read_only
     def test_14(self):
         """Return of /single/receivers/<uuid>/staged/ meets the schema"""
         test = Test("Return of /single/receivers/<uuid>/staged/ meets the schema")
@@ -363,6 +378,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_read_only
     def test_15(self):
         """Staged parameters for senders comply with constraints"""
         test = Test("Staged parameters for senders comply with constraints")
@@ -375,6 +391,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_read_only
     def test_16(self):
         """Staged parameters for receivers comply with constraints"""
         test = Test("Staged parameters for receivers comply with constraints")
@@ -387,6 +404,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_mutates("senders")
     def test_17(self):
         """Sender patch response schema is valid"""
         test = Test("Sender patch response schema is valid")
@@ -399,6 +417,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_mutates("receivers")
     def test_18(self):
         """Receiver patch response schema is valid"""
         test = Test("Receiver patch response schema is valid")
@@ -411,6 +430,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_mutates("senders")
     def test_19(self):
         """Sender invalid patch is refused"""
         test = Test("Sender invalid patch is refused")
@@ -423,6 +443,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_mutates("receivers")
     def test_20(self):
         """Receiver invalid patch is refused"""
         test = Test("Receiver invalid patch is refused")
@@ -435,6 +456,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_mutates("receivers")
     def test_21(self):
         """Sender id on staged receiver is changeable"""
         test = Test("Sender id on staged receiver is changeable")
@@ -464,6 +486,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_mutates("senders")
     def test_22(self):
         """Receiver id on staged sender is changeable"""
         test = Test("Receiver id on staged sender is changeable")
@@ -493,45 +516,52 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_mutates("senders")
     def test_23(self):
         """Sender transport parameters are changeable"""
         test = Test("Sender transport parameters are changeable")
         if len(self.senders) > 0:
             for sender in self.senders:
-                valid, values = self.is05_utils.generate_destination_ports("sender", sender)
-                if valid:
-                    valid2, response2 = self.is05_utils.check_change_transport_param("sender", self.senders,
-                                                                                     "destination_port", values, sender)
-                    if valid2:
-                        pass
+                with self.is05_utils.request_scope():
+                    valid, values = self.is05_utils.generate_destination_ports("sender", sender)
+                    if valid:
+                        valid2, response2 = self.is05_utils.check_change_transport_param("sender", self.senders,
+                                                                                         "destination_port", values,
+                                                                                         sender)
+                        if valid2:
+                            pass
+                        else:
+                            return test.FAIL(response2)
                     else:
-                        return test.FAIL(response2)
-                else:
-                    return test.FAIL(values)
+                        return test.FAIL(values)
             return test.PASS()
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_mutates("receivers")
     def test_24(self):
         """Receiver transport parameters are changeable"""
         test = Test("Receiver transport parameters are changeable")
         if len(self.receivers) > 0:
             for receiver in self.receivers:
-                valid, values = self.is05_utils.generate_destination_ports("receiver", receiver)
-                if valid:
-                    valid2, response2 = self.is05_utils.check_change_transport_param("receiver", self.receivers,
-                                                                                     "destination_port", values,
-                                                                                     receiver)
-                    if valid2:
-                        pass
+                with self.is05_utils.request_scope():
+                    valid, values = self.is05_utils.generate_destination_ports("receiver", receiver)
+                    if valid:
+                        valid2, response2 = self.is05_utils.check_change_transport_param("receiver", self.receivers,
+                                                                                         "destination_port", values,
+                                                                                         receiver)
+                        if valid2:
+                            pass
+                        else:
+                            return test.FAIL(response2)
                     else:
-                        return test.FAIL(response2)
-                else:
-                    return test.FAIL(values)
+                        return test.FAIL(values)
             return test.PASS()
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_mutates("senders")
+    @test_timeout(None)  # Activates every sender in turn, so takes longer the more there are
     def test_25(self):
         """Immediate activation of a sender is possible"""
         test = Test("Immediate activation of a sender is possible")
@@ -547,6 +577,8 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_mutates("receivers")
+    @test_timeout(None)  # Activates every receiver in turn, so takes longer the more there are
     def test_26(self):
         """Immediate activation of a receiver is possible"""
         test = Test("Immediate activation of a receiver is possible")
@@ -562,6 +594,8 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_mutates("senders")
+    @test_timeout(None)  # Activates every sender in turn, so takes longer the more there are
     def test_27(self):
         """Relative activation of a sender is possible"""
         test = Test("Relative activation of a sender is possible")
@@ -577,6 +611,8 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_mutates("receivers")
+    @test_timeout(None)  # Activates every receiver in turn, so takes longer the more there are
     def test_28(self):
         """Relative activation of a receiver is possible"""
         test = Test("Relative activation of a receiver is possible")
@@ -592,6 +628,8 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_mutates("senders")
+    @test_timeout(None)  # Activates every sender in turn, so takes longer the more there are
     def test_29(self):
         """Absolute activation of a sender is possible"""
         test = Test("Absolute activation of a sender is possible")
@@ -607,6 +645,8 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_mutates("receivers")
+    @test_timeout(None)  # Activates every receiver in turn, so takes longer the more there are
     def test_30(self):
         """Absolute activation of a receiver is possible"""
         test = Test("Absolute activation of a receiver is possible")
@@ -622,6 +662,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_read_only
     def test_31(self):
         """Sender active response schema is valid"""
         test = Test("Sender active response schema is valid")
@@ -638,6 +679,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_read_only
     def test_32(self):
         """Receiver active response schema is valid"""
         test = Test("Receiver active response schema is valid")
@@ -654,6 +696,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_read_only
     def test_33(self):
         """/bulk/ endpoint returns correct JSON"""
         test = Test("/bulk/ endpoint returns correct JSON")
@@ -669,6 +712,7 @@ class IS0501Test(GenericTest):
         else:
             return test.FAIL(response)
 
+    @test_read_only
     def test_34(self):
         """GET on /bulk/senders returns 405"""
         test = Test("GET on /bulk/senders returns 405")
@@ -679,6 +723,7 @@ class IS0501Test(GenericTest):
         else:
             return test.FAIL(response)
 
+    @test_read_only
     def test_35(self):
         """GET on /bulk/receivers returns 405"""
         test = Test("GET on /bulk/receivers returns 405")
@@ -689,6 +734,7 @@ class IS0501Test(GenericTest):
         else:
             return test.FAIL(response)
 
+    @test_mutates("senders")
     def test_36(self):
         """Bulk interface can be used to change destination port on all senders"""
         test = Test("Bulk interface can be used to change destination port on all senders")
@@ -701,6 +747,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_mutates("receivers")
     def test_37(self):
         """Bulk interface can be used to change destination port on all receivers"""
         test = Test("Bulk interface can be used to change destination port on all receivers")
@@ -713,6 +760,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_read_only
     def test_38(self):
         """Number of legs matches on constraints, staged and active endpoint for senders"""
         test = Test("Number of legs matches on constraints, staged and active endpoint for senders")
@@ -728,6 +776,7 @@ class IS0501Test(GenericTest):
         else:
             return test.NA("Not tested. No resources found.")
 
+    @test_read_only
     def test_39(self):
         """Number of legs matches on constraints, staged and active endpoint for receivers"""
         test = Test("Number of legs matches on constraints, staged and active endpoint for receivers")
@@ -762,7 +811,7 @@ class IS0501Test(GenericTest):
             else:
                 return False, response
         try:
-            r = requests.post(url, json=data)
+            r = TestHelper.request("POST", url, json=data)
             msg = "Expected a 200 response from {}, got {}".format(url, r.status_code)
             if r.status_code == 200:
                 pass
@@ -773,7 +822,7 @@ class IS0501Test(GenericTest):
 
         schema = self.get_schema(CONN_API_KEY, "POST", "/bulk/" + port + "s", 200)
         try:
-            Draft4Validator(schema).validate(r.json())
+            self.get_validator(CONN_API_KEY, schema, Draft4Validator).validate(r.json())
         except ValidationError as e:
             return False, "Response to post at {} did not validate against schema: {}".format(url, str(e))
         except:
@@ -812,7 +861,7 @@ class IS0501Test(GenericTest):
             if valid:
                 schema = self.get_schema(CONN_API_KEY, "PATCH", "/single/" + port + "s/{" + port + "Id}/staged", 200)
                 try:
-                    Draft4Validator(schema).validate(response)
+                    self.get_validator(CONN_API_KEY, schema, Draft4Validator).validate(response)
                 except ValidationError as e:
                     return False, "Response to empty patch to {} does not comply with schema: {}".format(url, str(e))
             else:
@@ -826,7 +875,7 @@ class IS0501Test(GenericTest):
             dest = "single/" + port + "s/" + myPort + "/staged/"
             valid, response = self.is05_utils.checkCleanRequestJSON("GET", dest)
             if valid:
-                schema = self.load_schema(CONN_API_KEY, "v1.0_" + port + "_transport_params_rtp.json")
+                schema = copy.deepcopy(self.load_schema(CONN_API_KEY, "v1.0_" + port + "_transport_params_rtp.json"))
                 resolver = RefResolver(self.file_prefix + os.path.join(self.apis[CONN_API_KEY]["spec_path"] +
                                                                        '/APIs/schemas/'),
                                        schema)
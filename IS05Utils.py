@@ -14,18 +14,72 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
 import re
 import requests
 import time
 import TestHelper
 
+from contextlib import contextmanager
+from functools import wraps
 from random import randint
+from threading import local
 from NMOSUtils import NMOSUtils
 
 
+def request_scoped(func):
+    """Decorator to re-use responses to repeated requests made by a helper, as for IS05Utils.request_scope"""
+    @wraps(func)
+    def scoped(self, *args, **kwargs):
+        with self.request_scope():
+            return func(self, *args, **kwargs)
+    return scoped
+
+
 class IS05Utils(NMOSUtils):
     def __init__(self, url):
         NMOSUtils.__init__(self, url)
+        # Responses cached within the request scope each thread has open, if any
+        self._scope = local()
+
+    @contextmanager
+    def request_scope(self):
+        """Re-use the responses to GET requests made with checkCachedRequestJSON within this scope. Cached responses
+        for a sender or receiver, other than its constraints, are discarded when it is modified via checkCleanRequest.
+        Each thread has its own scope, and scopes opened within another share the outer scope's responses."""
+        if getattr(self._scope, "cache", None) is not None:
+            yield
+            return
+        self._scope.cache = {}
+        # Resources with a scheduled activation may change without further requests, so aren't cached again
+        self._scope.scheduled = set()
+        try:
+            yield
+        finally:
+            self._scope.cache = None
+
+    def _resource_prefix(self, dest):
+        """Get the path common to all URLs which may be affected by a request to the given path"""
+        parts = dest.split("/")
+        if parts[0] == "single" and len(parts) > 2:
+            return "/".join(parts[:3]) + "/"
+        elif parts[0] == "bulk" and len(parts) > 1:
+            return "single/" + parts[1] + "/"
+        return ""
+
+    def _is_constraints(self, dest):
+        return dest.rstrip("/").endswith("/constraints")
+
+    def _invalidate(self, dest, scheduled=False):
+        """Discard any cached responses which may be affected by a request to the given path. Constraints can't be
+        changed through the API, so are kept."""
+        if getattr(self._scope, "cache", None) is None:
+            return
+        prefix = self.url + self._resource_prefix(dest)
+        for url in [url for url in self._scope.cache if url.startswith(prefix) and not self._is_constraints(url)]:
+            del self._scope.cache[url]
+        if scheduled:
+            self._scope.scheduled.add(prefix)
 
     def get_valid_transports(self, api_version):
         """Identify the valid transport types for a given version of IS-05"""
@@ -38,6 +92,7 @@ class IS05Utils(NMOSUtils):
             valid_transports.append("urn:x-nmos:transport:mqtt")
         return valid_transports
 
+    @request_scoped
     def check_num_legs(self, url, type, uuid):
         """Checks the number of legs present on a given sender/receiver"""
         max = 2
@@ -45,11 +100,11 @@ class IS05Utils(NMOSUtils):
         constraintsUrl = url + "constraints/"
         stagedUrl = url + "staged/"
         activeUrl = url + "active/"
-        valid1, constraints = self.checkCleanRequestJSON("GET", constraintsUrl)
+        valid1, constraints = self.checkCachedRequestJSON(constraintsUrl)
         if valid1:
-            valid2, staged = self.checkCleanRequestJSON("GET", stagedUrl)
+            valid2, staged = self.checkCachedRequestJSON(stagedUrl)
             if valid2:
-                valid3, active = self.checkCleanRequestJSON("GET", activeUrl)
+                valid3, active = self.checkCachedRequestJSON(activeUrl)
                 if valid3:
                     try:
                         stagedParams = staged['transport_params']
@@ -373,6 +428,7 @@ class IS05Utils(NMOSUtils):
         else:
             return False, response
 
+    @request_scoped
     def check_activation(self, port, portId, activationMethod):
         """Checks that when an immediate activation is called staged parameters are moved
         to active and the activation is correctly displayed in the /active endpoint"""
@@ -398,11 +454,12 @@ class IS05Utils(NMOSUtils):
         else:
             return False, destinationPort
 
+    @request_scoped
     def generate_destination_ports(self, port, portId):
         """Uses a port's constraints to generate an allowable destination
         ports for it"""
         url = "single/" + port + "s/" + portId + "/constraints/"
-        valid, constraints = self.checkCleanRequestJSON("GET", url)
+        valid, constraints = self.checkCachedRequestJSON(url)
         if valid:
             toReturn = []
             try:
@@ -427,6 +484,7 @@ class IS05Utils(NMOSUtils):
         else:
             return False, constraints
 
+    @request_scoped
     def check_change_transport_param(self, port, portList, paramName, paramValues, myPort):
         """Check that we can update a transport parameter"""
         url = "single/" + port + "s/" + myPort + "/staged"
@@ -481,6 +539,7 @@ class IS05Utils(NMOSUtils):
                 return False, response
         return True, ""
 
+    @request_scoped
     def check_params_match(self, port, portList):
         """Generic test for checking params listed in the /constraints endpoint
         are listed in in the /staged and /active endpoints"""
@@ -488,9 +547,9 @@ class IS05Utils(NMOSUtils):
             rDest = "single/" + port + "/" + myPort + "/constraints/"
             sDest = "single/" + port + "/" + myPort + "/staged/"
             aDest = "single/" + port + "/" + myPort + "/active/"
-            r_valid, r_response = self.checkCleanRequestJSON("GET", rDest)
-            s_valid, s_response = self.checkCleanRequestJSON("GET", sDest)
-            a_valid, a_response = self.checkCleanRequestJSON("GET", aDest)
+            r_valid, r_response = self.checkCachedRequestJSON(rDest)
+            s_valid, s_response = self.checkCachedRequestJSON(sDest)
+            a_valid, a_response = self.checkCachedRequestJSON(aDest)
             count = 0
             amsg = "Expected an array to be returned {} but got {}".format(rDest, r_response)
             omsg = "Expected array entries to be dictionaries at {} but got {}".format(rDest, r_response)
@@ -559,7 +618,7 @@ class IS05Utils(NMOSUtils):
         """Gets a list of the available senders on the API"""
         toReturn = []
         try:
-            r = requests.get(self.url + "single/senders/")
+            r = TestHelper.request("GET", self.url + "single/senders/")
             try:
                 for value in r.json():
                     toReturn.append(value[:-1])
@@ -573,7 +632,7 @@ class IS05Utils(NMOSUtils):
         """Gets a list of the available receivers on the API"""
         toReturn = []
         try:
-            r = requests.get(self.url + "single/receivers/")
+            r = TestHelper.request("GET", self.url + "single/receivers/")
             try:
                 for value in r.json():
                     toReturn.append(value[:-1])
@@ -585,17 +644,12 @@ class IS05Utils(NMOSUtils):
 
     def get_num_paths(self, port, portType):
         """Returns the number or redundant paths on a port"""
-        url = self.url + "single/" + portType + "s/" + port + "/constraints/"
-        try:
-            r = requests.get(url)
-            try:
-                rjson = r.json()
-                return len(rjson)
-            except ValueError:
-                return 0
-        except requests.exceptions.RequestException:
-            return 0
+        valid, constraints = self.checkCachedRequestJSON("single/" + portType + "s/" + port + "/constraints/")
+        if valid:
+            return len(constraints)
+        return 0
 
+    @request_scoped
     def park_resource(self, resource_type, resource_id):
         url = "single/" + resource_type + "/" + resource_id + "/staged"
         data = {"master_enable": False}
@@ -612,6 +666,7 @@ class IS05Utils(NMOSUtils):
 
         return True, ""
 
+    @request_scoped
     def subscribe_resource(self, resource_type, resource_id, subscription_id, multicast=True):
         url = "single/" + resource_type + "/" + resource_id + "/staged"
 
@@ -647,6 +702,9 @@ class IS05Utils(NMOSUtils):
     def checkCleanRequest(self, method, dest, data=None, code=200):
         """Checks a request can be made and the resulting json can be parsed"""
         status, response = TestHelper.do_request(method, self.url + dest, data)
+        if method.upper() != "GET":
+            # A scheduled activation is accepted with a 202
+            self._invalidate(dest, scheduled=status and response.status_code == 202)
         if not status:
             return status, response
 
@@ -666,3 +724,20 @@ class IS05Utils(NMOSUtils):
                 return False, "Invalid JSON received"
         else:
             return valid, response
+
+    def checkCachedRequestJSON(self, dest):
+        """Make a GET request as checkCleanRequestJSON, re-using the response to any earlier request for the same path
+        within the current request scope"""
+        cache = getattr(self._scope, "cache", None)
+        url = self.url + dest
+        if cache is None or (not self._is_constraints(dest) and
+                             any(url.startswith(prefix) for prefix in self._scope.scheduled)):
+            return self.checkCleanRequestJSON("GET", dest)
+
+        if url not in cache:
+            valid, response = self.checkCleanRequestJSON("GET", dest)
+            if not valid:
+                return valid, response
+            cache[url] = response
+        # Callers may modify the response they're given
+        return True, copy.deepcopy(cache[url])
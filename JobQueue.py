@@ -0,0 +1,176 @@
+# Copyright (C) 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import uuid
+
+from threading import Thread, Lock, Condition
+from queue import Queue
+
+
+class Job(object):
+    """A single queued test run"""
+    PENDING = "Pending"
+    RUNNING = "Running"
+    COMPLETE = "Complete"
+    FAILED = "Failed"
+
+    def __init__(self, test_id, target, url=None):
+        self.id = str(uuid.uuid4())
+        self.test_id = test_id
+        self.target = target
+        self.url = url
+        self.status = Job.PENDING
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+        # Results are collected as they are produced, so that progress can be followed while the job runs
+        self.results = []
+        self.expected_results = None
+        self.test_obj = None
+        self.abort_requested = False
+        self.condition = Condition()
+
+    def run(self):
+        """Execute the job's target, capturing its result or any exception raised. The target is passed the Job."""
+        with self.condition:
+            if self.abort_requested:
+                self.error = "Test run was aborted before it started"
+                self.status = Job.FAILED
+                self.finished = time.time()
+                self.condition.notify_all()
+                return
+            self.started = time.time()
+            self.status = Job.RUNNING
+            self.condition.notify_all()
+        try:
+            result = self.target(self)
+            with self.condition:
+                self.result = result
+                self.status = Job.COMPLETE
+        except Exception as e:
+            print(" * ERROR: Job {} failed: {}".format(self.id, e))
+            with self.condition:
+                self.error = str(e)
+                self.status = Job.FAILED
+        finally:
+            with self.condition:
+                self.finished = time.time()
+                self.condition.notify_all()
+
+    def attach(self, test_obj, test_selection):
+        """Follow the results of a test object which is about to be run on behalf of this job"""
+        with self.condition:
+            self.test_obj = test_obj
+            self.expected_results = test_obj.expected_result_count(test_selection)
+            test_obj.result_listener = self.add_result
+            if self.abort_requested:
+                test_obj.abort()
+
+    def add_result(self, result):
+        with self.condition:
+            self.results.append(result)
+            self.condition.notify_all()
+
+    def abort(self):
+        """Stop the job as soon as possible, or prevent it starting if it is still queued"""
+        with self.condition:
+            self.abort_requested = True
+            if self.test_obj:
+                self.test_obj.abort()
+
+    def wait(self, result_count, timeout=None):
+        """Wait until more than result_count results are available or the job has finished"""
+        with self.condition:
+            if len(self.results) <= result_count and not self.is_finished():
+                self.condition.wait(timeout)
+
+    def is_finished(self):
+        return self.status in [Job.COMPLETE, Job.FAILED]
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "test": self.test_id,
+            "url": self.url,
+            "status": self.status,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "progress": len(self.results),
+            "expected": self.expected_results,
+            "result": self.result
+        }
+
+
+class JobQueue(object):
+    """Executes test runs on a pool of worker threads, retaining the most recent jobs for inspection"""
+    def __init__(self, workers=1, history=100):
+        self.workers = workers
+        self.history = history
+        self.jobs = {}
+        self.pending = []
+        self.queue = Queue()
+        self.lock = Lock()
+        self.threads = []
+
+    def start(self):
+        """Start the worker threads. Safe to call more than once."""
+        with self.lock:
+            while len(self.threads) < self.workers:
+                t = Thread(target=self.worker)
+                t.daemon = True
+                t.start()
+                self.threads.append(t)
+
+    def submit(self, test_id, target, url=None):
+        """Queue a callable for execution and return the Job which tracks it"""
+        job = Job(test_id, target, url)
+        with self.lock:
+            self.jobs[job.id] = job
+            self.pending.append(job.id)
+            self._prune()
+        self.queue.put(job)
+        self.start()
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def position(self, job_id):
+        """Get the number of jobs ahead of the given one in the queue, or None if it is no longer queued"""
+        with self.lock:
+            if job_id in self.pending:
+                return self.pending.index(job_id)
+        return None
+
+    def _prune(self):
+        """Discard the oldest finished jobs once the history limit is exceeded"""
+        finished = [job for job in self.jobs.values() if job.is_finished()]
+        finished = sorted(finished, key=lambda x: x.finished)
+        while len(self.jobs) > self.history and len(finished) > 0:
+            self.jobs.pop(finished.pop(0).id)
+
+    def worker(self):
+        while True:
+            job = self.queue.get()
+            with self.lock:
+                self.pending.remove(job.id)
+            job.run()
+            self.queue.task_done()
@@ -19,8 +19,8 @@ from flask import Blueprint, make_response, abort
 
 
 class Node(object):
-    def __init__(self):
-        pass
+    def __init__(self, port=5000):
+        self.port = port
 
     def get_sender(self, stream_type="video"):
         default_gw_interface = netifaces.gateways()['default'][netifaces.AF_INET][1]
@@ -33,7 +33,7 @@ class Node(object):
             "version": "50:50",
             "caps": {},
             "tags": {},
-            "manifest_href": "http://{}:5000/{}.sdp".format(default_ip, stream_type),
+            "manifest_href": "http://{}:{}/{}.sdp".format(default_ip, self.port, stream_type),
             "flow_id": str(uuid.uuid4()),
             "transport": "urn:x-nmos:transport:rtp.mcast",
             "device_id": str(uuid.uuid4()),
@@ -46,7 +46,6 @@ class Node(object):
         return sender
 
 
-NODE = Node()
 NODE_API = Blueprint('node_api', __name__)
 
 
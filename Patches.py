@@ -16,6 +16,8 @@
 import os
 import jsonref
 
+from SchemaStore import get_schema_store
+
 
 # Work around ramlfications Windows compatibility issues and loader caching. The following method is modified from
 # the original in https://github.com/spotify/ramlfications/blob/master/ramlfications/loader.py
@@ -33,8 +35,8 @@ def _parse_json(self, jsonfile, base_path):
     else:
         base_path = "file://" + base_path
 
-    loader = jsonref.JsonLoader(cache_results=False)
-
+    # Referenced files are only loaded once per snapshot, by the loader of the schema directory's store
+    loader = get_schema_store(os.path.dirname(os.path.abspath(jsonfile))).loader
     with open(jsonfile, "r") as f:
         schema = jsonref.load(f, base_uri=base_path, loader=loader, jsonschema=True)
     return schema
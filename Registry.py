@@ -12,13 +12,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import socket
 import time
 
-from flask import request, jsonify, abort, Blueprint
+from flask import request, jsonify, abort, Blueprint, current_app
 
 
 class Registry(object):
-    def __init__(self):
+    def __init__(self, port=5000):
+        self.port = port
+        self.client_addresses = None
         self.last_time = 0
         self.last_hb_time = 0
         self.data = []
@@ -51,30 +54,51 @@ class Registry(object):
     def get_heartbeats(self):
         return self.heartbeats
 
-    def enable(self):
+    def enable(self, client_address=None):
+        """Accept registrations, optionally only from the Node with the given hostname or address"""
+        self.client_addresses = None
+        if client_address:
+            # Requests are identified by the address they came from, so any hostname is resolved to its addresses
+            self.client_addresses = {client_address}
+            try:
+                self.client_addresses.update(info[4][0] for info in socket.getaddrinfo(client_address, None))
+            except socket.gaierror as e:
+                print(" * ERROR: Unable to resolve Node address '{}': {}".format(client_address, e))
         self.enabled = True
 
     def disable(self):
         self.enabled = False
+        self.client_addresses = None
+
+    def accepts(self, remote_address):
+        if remote_address and remote_address.startswith("::ffff:"):
+            # IPv4 clients of a dual-stack server are seen at IPv4-mapped IPv6 addresses
+            remote_address = remote_address[len("::ffff:"):]
+        return self.enabled and (self.client_addresses is None or remote_address in self.client_addresses)
 
 
-REGISTRY = Registry()
 REGISTRY_API = Blueprint('registry_api', __name__)
 
 
+def get_registry():
+    """Get the Registry instance which belongs to the Flask app handling the current request"""
+    return current_app.config["REGISTRY"]
+
+
 # IS-04 resources
 @REGISTRY_API.route('/x-nmos/registration/<version>/resource', methods=["POST"])
 def reg_page(version):
-    if not REGISTRY.enabled:
+    registry = get_registry()
+    if not registry.accepts(request.remote_addr):
         abort(500)
     registered = False
     try:
         # Type may not be in the list, so this could throw an exception
-        if request.json["data"]["id"] in REGISTRY.resources[request.json["type"]]:
+        if request.json["data"]["id"] in registry.resources[request.json["type"]]:
             registered = True
     except:
         pass
-    REGISTRY.add(request.headers, request.json)
+    registry.add(request.headers, request.json)
     if registered:
         return jsonify(request.json["data"]), 200
     else:
@@ -83,10 +107,11 @@ def reg_page(version):
 
 @REGISTRY_API.route('/x-nmos/registration/<version>/health/nodes/<node_id>', methods=["POST"])
 def heartbeat(version, node_id):
-    if not REGISTRY.enabled:
+    registry = get_registry()
+    if not registry.accepts(request.remote_addr):
         abort(404)
-    REGISTRY.heartbeat(request.headers, request.json, node_id)
-    if node_id in REGISTRY.resources["node"]:
+    registry.heartbeat(request.headers, request.json, node_id)
+    if node_id in registry.resources["node"]:
         return jsonify({"health": int(time.time())})
     else:
         abort(404)
@@ -0,0 +1,95 @@
+# Copyright (C) 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sqlite3
+import time
+
+from contextlib import contextmanager
+from threading import Lock
+
+
+class ResultStore(object):
+    """
+    Persistent store of test results, keyed by test definition, device endpoint(s), API version(s), specification
+    commit(s) and test. Used to re-run only those tests which need it.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = Lock()
+        with self.lock, self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS results ("
+                       "test_id TEXT, endpoint TEXT, version TEXT, spec_commit TEXT, test_key TEXT, "
+                       "position INTEGER, description TEXT, status TEXT, detail TEXT, name TEXT, elapsed TEXT, "
+                       "run_time REAL, PRIMARY KEY (test_id, endpoint, version, test_key))")
+
+    @contextmanager
+    def _connect(self):
+        # SQLite connections can't be shared between threads, so use one per operation
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _run_key(self, apis):
+        """Identify the endpoint(s), version(s) and specification commit(s) which a set of results applies to"""
+        api_names = sorted(apis)
+        endpoint = " ".join([apis[api]["base_url"] for api in api_names])
+        version = " ".join([apis[api]["version"] for api in api_names])
+        spec_commit = " ".join([apis[api].get("spec_commit", "") for api in api_names])
+        return endpoint, version, spec_commit
+
+    def _test_key(self, result):
+        """Automatically defined tests are numbered in the order they run, so are identified by description instead"""
+        if result[3].startswith("auto_"):
+            return "auto: " + result[0]
+        return result[3]
+
+    def save(self, test_id, apis, results, incomplete=()):
+        """Record the results of a test run, replacing any previous result for the same tests. The previous results of
+        tests named in incomplete, which were aborted or timed out, are discarded so that they are run again."""
+        endpoint, version, spec_commit = self._run_key(apis)
+        run_time = time.time()
+        rows = []
+        for position, result in enumerate(results):
+            # Skip the initialisation, set up and tear down entries
+            if result[3] in ["__init__", "run_tests"] or result[3] in incomplete:
+                continue
+            rows.append((test_id, endpoint, version, spec_commit, self._test_key(result), position) +
+                        tuple(result) + (run_time,))
+
+        # The descriptions of automatically defined tests include the IDs of resources, which change from run to
+        # run, so their results are replaced as a whole. They're always run together, so if one didn't complete,
+        # all are run again.
+        auto_incomplete = any(name.startswith("auto_") for name in incomplete)
+        if auto_incomplete:
+            rows = [row for row in rows if not row[9].startswith("auto_")]
+        with self.lock, self._connect() as db:
+            if auto_incomplete or any(row[9].startswith("auto_") for row in rows):
+                db.execute("DELETE FROM results WHERE test_id = ? AND endpoint = ? AND version = ? AND "
+                           "test_key LIKE 'auto: %'", (test_id, endpoint, version))
+            db.executemany("DELETE FROM results WHERE test_id = ? AND endpoint = ? AND version = ? AND test_key = ?",
+                           [(test_id, endpoint, version, name) for name in incomplete if not name.startswith("auto_")])
+            db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def load(self, test_id, apis):
+        """Get the most recent result of each test run against the same endpoint, version and specification commit,
+        in the order they were originally produced"""
+        endpoint, version, spec_commit = self._run_key(apis)
+        with self.lock, self._connect() as db:
+            rows = db.execute("SELECT description, status, detail, name, elapsed FROM results "
+                              "WHERE test_id = ? AND endpoint = ? AND version = ? AND spec_commit = ? "
+                              "ORDER BY run_time, position", (test_id, endpoint, version, spec_commit)).fetchall()
+        return [list(row) for row in rows]
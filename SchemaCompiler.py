@@ -0,0 +1,492 @@
+# Copyright (C) 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+
+from jsonschema import Draft4Validator, ValidationError
+# Values are compared, and errors described, exactly as jsonschema does
+from jsonschema._utils import uniq, unbool, extras_msg, find_additional_properties
+from urllib.parse import unquote, urldefrag, urljoin, urlsplit
+
+
+# Types checked by the generated code, matching those of jsonschema's draft 4 validator
+TYPE_CHECKS = {
+    "array": "isinstance({0}, list)",
+    "boolean": "isinstance({0}, bool)",
+    "integer": "(isinstance({0}, int) and not isinstance({0}, bool))",
+    "null": "{0} is None",
+    "number": "(isinstance({0}, (int, float)) and not isinstance({0}, bool))",
+    "object": "isinstance({0}, dict)",
+    "string": "isinstance({0}, str)"
+}
+
+DRAFT4_SCHEMA_URIS = ["http://json-schema.org/draft-04/schema#", "http://json-schema.org/draft-04/schema"]
+
+
+class UnsupportedSchema(Exception):
+    """Raised for schemas which can't be compiled, and should be validated by jsonschema instead"""
+    pass
+
+
+class CompiledValidator(object):
+    """
+    Validates instances against a draft 4 JSON schema using Python code generated for that schema, which is much faster
+    than interpreting the schema for each instance. Provides the parts of the jsonschema validator interface used by
+    the tests. Compiled validators hold no state while validating, so may be shared between threads.
+    """
+    def __init__(self, schema, function, source):
+        self.schema = schema
+        self.source = source
+        self._function = function
+
+    def validate(self, instance):
+        """Raise a jsonschema ValidationError for the first problem found with an instance"""
+        try:
+            self._function(instance, ())
+        except _Invalid as e:
+            raise e.validation_error()
+
+    def iter_errors(self, instance):
+        """Yield the first problem found with an instance, if there is one"""
+        try:
+            self._function(instance, ())
+        except _Invalid as e:
+            yield e.validation_error()
+
+    def is_valid(self, instance):
+        try:
+            self._function(instance, ())
+            return True
+        except _Invalid:
+            return False
+
+
+class CompiledValidationError(ValidationError):
+    """ValidationError whose string form includes the location of the problem, as the schema details included by
+    jsonschema's errors aren't available"""
+    def __str__(self):
+        if self.path:
+            return "{}: {}".format("".join("[{!r}]".format(part) for part in self.path), self.message)
+        return self.message
+
+
+class _Invalid(Exception):
+    """Raised by generated code when an instance is invalid. The error message is only formatted if it is reported, as
+    many errors are caught while checking combinations of schemas."""
+    def __init__(self, message, args, path, parts):
+        self.message = message
+        self.message_args = args
+        self.path = path + parts
+
+    def validation_error(self):
+        return CompiledValidationError(self.message.format(*self.message_args), path=self.path)
+
+
+def _in_enum(instance, enums):
+    if instance == 0 or instance == 1:
+        unbooled = unbool(instance)
+        return any(unbooled == unbool(each) for each in enums)
+    return instance in enums
+
+
+def _not_multiple_of(instance, multiple):
+    if isinstance(multiple, float):
+        quotient = instance / multiple
+        return int(quotient) != quotient
+    return instance % multiple
+
+
+def _passes(function, instance, path):
+    try:
+        function(instance, path)
+        return True
+    except _Invalid:
+        return False
+
+
+def _count_passes(functions, instance, path, limit):
+    count = 0
+    for function in functions:
+        if _passes(function, instance, path):
+            count += 1
+            if count == limit:
+                break
+    return count
+
+
+def _valid_under_each(functions, schemas, instance, path):
+    """Describe the schemas of a oneOf which an instance is valid under, in the order jsonschema lists them"""
+    valid = [schema for function, schema in zip(functions, schemas) if _passes(function, instance, path)]
+    return ", ".join(repr(schema) for schema in valid[1:] + valid[:1])
+
+
+def _additional_items_message(instance, count):
+    return "Additional items are not allowed (%s %s unexpected)" % extras_msg(instance[count:])
+
+
+def _additional_properties_message(instance, schema):
+    extras = set(find_additional_properties(instance, schema))
+    if "patternProperties" in schema:
+        return "%s %s not match any of the regexes: %s" % (", ".join(map(repr, sorted(extras))),
+                                                           "does" if len(extras) == 1 else "do",
+                                                           ", ".join(map(repr, sorted(schema["patternProperties"]))))
+    return "Additional properties are not allowed (%s %s unexpected)" % extras_msg(extras)
+
+
+class SchemaCompiler(object):
+    """
+    Generates Python source for a draft 4 JSON schema, with a function for the schema itself and for each schema it
+    refers to or combines. The keywords handled are those jsonschema validates for draft 4, so the same instances are
+    accepted. Formats are not checked, as jsonschema doesn't check them without a format checker.
+    """
+    def __init__(self, base_uri, documents):
+        # Documents which references may be resolved to, by URI, including the meta-schema as jsonschema does
+        self.documents = {urlsplit(uri).geturl(): document for uri, document in documents.items()}
+        self.documents[DRAFT4_SCHEMA_URIS[1]] = Draft4Validator.META_SCHEMA
+        self.base_uri = urlsplit(base_uri).geturl()
+        self.functions = {}
+        self.pending = []
+        self.lines = []
+        self.namespace = {
+            "_Invalid": _Invalid,
+            "_in_enum": _in_enum,
+            "_not_multiple_of": _not_multiple_of,
+            "_passes": _passes,
+            "_count_passes": _count_passes,
+            "_valid_under_each": _valid_under_each,
+            "_additional_items_message": _additional_items_message,
+            "_additional_properties_message": _additional_properties_message,
+            "_uniq": uniq
+        }
+        self.variable_count = 0
+
+    def compile(self, schema):
+        """Generate and execute the code for a schema, returning a CompiledValidator"""
+        if not isinstance(schema, dict):
+            raise UnsupportedSchema("Schema is not an object")
+        if schema.get("$schema", DRAFT4_SCHEMA_URIS[0]) not in DRAFT4_SCHEMA_URIS:
+            raise UnsupportedSchema("Schema is not draft 4")
+
+        self.documents[self.base_uri] = schema
+        if isinstance(schema.get("id"), str):
+            self.documents[urlsplit(schema["id"]).geturl()] = schema
+
+        name = self._function(schema, self.base_uri, ("schema", id(schema), self.base_uri))
+        while self.pending:
+            self._write_function(*self.pending.pop(0))
+
+        source = "\n".join(self.lines)
+        exec(compile(source, "<compiled schema>", "exec"), self.namespace)
+        return CompiledValidator(schema, self.namespace[name], source)
+
+    def _function(self, schema, scope, key):
+        """Get the name of the function validating a schema, arranging for it to be written if it hasn't been"""
+        if key not in self.functions:
+            self.functions[key] = "_validate_{}".format(len(self.functions))
+            self.pending.append((self.functions[key], schema, scope))
+        return self.functions[key]
+
+    def _constant(self, value):
+        name = "_const_{}".format(len(self.namespace))
+        self.namespace[name] = value
+        return name
+
+    def _regex(self, pattern):
+        try:
+            return self._constant(re.compile(pattern))
+        except re.error as e:
+            raise UnsupportedSchema("Invalid pattern '{}': {}".format(pattern, e))
+
+    def _variable(self):
+        self.variable_count += 1
+        return "v{}".format(self.variable_count)
+
+    def _write_function(self, name, schema, scope):
+        self.lines.append("def {}(data, path):".format(name))
+        self._generate(schema, scope, "data", [], 1)
+        self.lines.append("    return")
+        self.lines.append("")
+
+    def _emit(self, indent, line):
+        self.lines.append("    " * indent + line)
+
+    def _raise(self, indent, message, args, parts):
+        """Write a statement raising an error, with a message formatted from the values of a list of expressions if
+        it is reported"""
+        self._emit(indent, "raise _Invalid({!r}, ({}), path, ({}))".format(
+            message, "".join(arg + ", " for arg in args), "".join(part + ", " for part in parts)))
+
+    def _call_path(self, parts):
+        if parts:
+            return "path + ({})".format("".join(part + ", " for part in parts))
+        return "path"
+
+    def _resolve(self, scope, ref):
+        """Find the schema a reference refers to, returning its URI and contents"""
+        uri = urlsplit(urljoin(scope, ref)).geturl()
+        document_uri, fragment = urldefrag(uri)
+        if document_uri not in self.documents:
+            raise UnsupportedSchema("Reference to unknown document '{}'".format(document_uri))
+
+        resolved = self.documents[document_uri]
+        fragment = fragment.lstrip("/")
+        for part in (unquote(fragment).split("/") if fragment else []):
+            part = part.replace("~1", "/").replace("~0", "~")
+            if isinstance(resolved, list):
+                try:
+                    part = int(part)
+                except ValueError:
+                    pass
+            try:
+                resolved = resolved[part]
+            except (TypeError, LookupError):
+                raise UnsupportedSchema("Unresolvable reference '{}'".format(uri))
+        return uri, resolved
+
+    def _generate(self, schema, scope, var, parts, indent):
+        """Write the checks of a schema against the variable var, whose location is parts relative to path"""
+        if not isinstance(schema, dict):
+            raise UnsupportedSchema("Schema is not an object")
+
+        if isinstance(schema.get("id"), str):
+            scope = urljoin(scope, schema["id"])
+
+        # As with jsonschema, any other keywords alongside a reference are ignored
+        if "$ref" in schema:
+            uri, resolved = self._resolve(scope, schema["$ref"])
+            function = self._function(resolved, uri, ("ref", uri))
+            self._emit(indent, "{}({}, {})".format(function, var, self._call_path(parts)))
+            return
+
+        types = None
+        if "type" in schema:
+            types = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+            if any(t not in TYPE_CHECKS for t in types):
+                raise UnsupportedSchema("Unknown type in {}".format(types))
+            self._emit(indent, "if not ({}):".format(" or ".join(TYPE_CHECKS[t].format(var) for t in types)))
+            self._raise(indent + 1, "{!r} is not of type {}", [var, repr(", ".join(repr(t) for t in types))], parts)
+
+        if "enum" in schema:
+            enums = self._constant(schema["enum"])
+            self._emit(indent, "if not _in_enum({}, {}):".format(var, enums))
+            self._raise(indent + 1, "{!r} is not one of {!r}", [var, enums], parts)
+
+        self._generate_object(schema, scope, var, parts, indent, types)
+        self._generate_array(schema, scope, var, parts, indent, types)
+        self._generate_string(schema, var, parts, indent, types)
+        self._generate_number(schema, var, parts, indent, types)
+
+        for subschema in schema.get("allOf", []):
+            self._generate(subschema, scope, var, parts, indent)
+
+        if "anyOf" in schema:
+            functions = self._functions(schema["anyOf"], scope)
+            self._emit(indent, "if not _count_passes({}, {}, {}, 1):".format(functions, var, self._call_path(parts)))
+            self._raise(indent + 1, "{!r} is not valid under any of the given schemas", [var], parts)
+
+        if "oneOf" in schema:
+            functions = self._functions(schema["oneOf"], scope)
+            count = self._variable()
+            self._emit(indent, "{} = _count_passes({}, {}, {}, 2)".format(count, functions, var,
+                                                                          self._call_path(parts)))
+            self._emit(indent, "if {} == 0:".format(count))
+            self._raise(indent + 1, "{!r} is not valid under any of the given schemas", [var], parts)
+            self._emit(indent, "if {} > 1:".format(count))
+            self._raise(indent + 1, "{!r} is valid under each of {}",
+                        [var, "_valid_under_each({}, {}, {}, {})".format(functions, self._constant(schema["oneOf"]),
+                                                                        var, self._call_path(parts))], parts)
+
+        if "not" in schema:
+            function = self._function(schema["not"], scope, ("schema", id(schema["not"]), scope))
+            self._emit(indent, "if _passes({}, {}, {}):".format(function, var, self._call_path(parts)))
+            self._raise(indent + 1, "{!r} is not allowed for {!r}", [self._constant(schema["not"]), var], parts)
+
+    def _functions(self, schemas, scope):
+        """Get a tuple expression of the functions validating each of a list of schemas"""
+        return "({})".format("".join(self._function(subschema, scope, ("schema", id(subschema), scope)) + ", "
+                                     for subschema in schemas))
+
+    def _guard(self, indent, type_name, var, types):
+        """Write the check that keywords for a type apply to var, returning the indent of the keywords, or None if
+        they can't apply. The check is left out when the schema has already required that type."""
+        matching = [t for t in types or [type_name] if t == type_name or (type_name == "number" and t == "integer")]
+        if not matching:
+            return None
+        if types and len(types) == len(matching):
+            return indent
+        self._emit(indent, "if {}:".format(TYPE_CHECKS[type_name].format(var)))
+        return indent + 1
+
+    def _generate_object(self, schema, scope, var, parts, indent, types):
+        keywords = ["properties", "required", "additionalProperties", "patternProperties", "dependencies",
+                    "minProperties", "maxProperties"]
+        if not any(keyword in schema for keyword in keywords):
+            return
+
+        start = len(self.lines)
+        indent = self._guard(indent, "object", var, types)
+        if indent is None:
+            return
+
+        for name in schema.get("required", []):
+            self._emit(indent, "if {!r} not in {}:".format(name, var))
+            self._raise(indent + 1, "{!r} is a required property", [repr(name)], parts)
+
+        if "minProperties" in schema:
+            self._emit(indent, "if len({}) < {!r}:".format(var, schema["minProperties"]))
+            self._raise(indent + 1, "{!r} does not have enough properties", [var], parts)
+        if "maxProperties" in schema:
+            self._emit(indent, "if len({}) > {!r}:".format(var, schema["maxProperties"]))
+            self._raise(indent + 1, "{!r} has too many properties", [var], parts)
+
+        for name, subschema in schema.get("properties", {}).items():
+            self._generate_member(subschema, scope, var, repr(name), parts, indent)
+
+        for pattern, subschema in schema.get("patternProperties", {}).items():
+            key, value = self._variable(), self._variable()
+            self._emit(indent, "for {}, {} in {}.items():".format(key, value, var))
+            self._emit(indent + 1, "if {}.search({}):".format(self._regex(pattern), key))
+            self._generate_body(subschema, scope, value, parts + [key], indent + 2)
+
+        additional = schema.get("additionalProperties", True)
+        if additional is not True and additional != {}:
+            key, value = self._variable(), self._variable()
+            self._emit(indent, "for {}, {} in {}.items():".format(key, value, var))
+            condition = "{} not in {}".format(key, self._constant(frozenset(schema.get("properties", {}))))
+            if schema.get("patternProperties"):
+                patterns = self._regex("|".join(schema["patternProperties"]))
+                condition += " and not {}.search({})".format(patterns, key)
+            self._emit(indent + 1, "if {}:".format(condition))
+            if additional is False:
+                self._raise(indent + 2, "{}", ["_additional_properties_message({}, {})".format(
+                    var, self._constant(schema))], parts)
+            else:
+                self._generate_body(additional, scope, value, parts + [key], indent + 2)
+
+        for name, dependency in schema.get("dependencies", {}).items():
+            self._emit(indent, "if {!r} in {}:".format(name, var))
+            if isinstance(dependency, dict):
+                self._generate_body(dependency, scope, var, parts, indent + 1)
+            else:
+                for other in dependency:
+                    self._emit(indent + 1, "if {!r} not in {}:".format(other, var))
+                    self._raise(indent + 2, "{!r} is a dependency of {!r}", [repr(other), repr(name)], parts)
+
+        if len(self.lines) == start + 1 and self.lines[start].endswith(":"):
+            self._emit(indent, "pass")
+
+    def _generate_member(self, subschema, scope, var, key, parts, indent):
+        value = self._variable()
+        self._emit(indent, "if {} in {}:".format(key, var))
+        self._emit(indent + 1, "{} = {}[{}]".format(value, var, key))
+        self._generate_body(subschema, scope, value, parts + [key], indent + 1)
+
+    def _generate_body(self, schema, scope, var, parts, indent):
+        """Write the checks of a schema as the body of a block"""
+        start = len(self.lines)
+        self._generate(schema, scope, var, parts, indent)
+        if len(self.lines) == start:
+            self._emit(indent, "pass")
+
+    def _generate_array(self, schema, scope, var, parts, indent, types):
+        keywords = ["items", "additionalItems", "minItems", "maxItems", "uniqueItems"]
+        if not any(keyword in schema for keyword in keywords):
+            return
+
+        start = len(self.lines)
+        indent = self._guard(indent, "array", var, types)
+        if indent is None:
+            return
+
+        if "minItems" in schema:
+            self._emit(indent, "if len({}) < {!r}:".format(var, schema["minItems"]))
+            self._raise(indent + 1, "{!r} is too short", [var], parts)
+        if "maxItems" in schema:
+            self._emit(indent, "if len({}) > {!r}:".format(var, schema["maxItems"]))
+            self._raise(indent + 1, "{!r} is too long", [var], parts)
+        if schema.get("uniqueItems"):
+            self._emit(indent, "if not _uniq({}):".format(var))
+            self._raise(indent + 1, "{!r} has non-unique elements", [var], parts)
+
+        items = schema.get("items", {})
+        if isinstance(items, dict):
+            if items:
+                index, value = self._variable(), self._variable()
+                self._emit(indent, "for {}, {} in enumerate({}):".format(index, value, var))
+                self._generate_body(items, scope, value, parts + [index], indent + 1)
+        else:
+            for index, subschema in enumerate(items):
+                value = self._variable()
+                self._emit(indent, "if len({}) > {}:".format(var, index))
+                self._emit(indent + 1, "{} = {}[{}]".format(value, var, index))
+                self._generate_body(subschema, scope, value, parts + [str(index)], indent + 1)
+
+            additional = schema.get("additionalItems", True)
+            if additional is False:
+                self._emit(indent, "if len({}) > {}:".format(var, len(items)))
+                self._raise(indent + 1, "{}", ["_additional_items_message({}, {})".format(var, len(items))], parts)
+            elif isinstance(additional, dict) and additional:
+                index, value = self._variable(), self._variable()
+                self._emit(indent, "for {}, {} in enumerate({}[{}:], {}):".format(index, value, var, len(items),
+                                                                                  len(items)))
+                self._generate_body(additional, scope, value, parts + [index], indent + 1)
+
+        if len(self.lines) == start + 1 and self.lines[start].endswith(":"):
+            self._emit(indent, "pass")
+
+    def _generate_string(self, schema, var, parts, indent, types):
+        keywords = ["minLength", "maxLength", "pattern"]
+        if not any(keyword in schema for keyword in keywords):
+            return
+
+        indent = self._guard(indent, "string", var, types)
+        if indent is None:
+            return
+        if "minLength" in schema:
+            self._emit(indent, "if len({}) < {!r}:".format(var, schema["minLength"]))
+            self._raise(indent + 1, "{!r} is too short", [var], parts)
+        if "maxLength" in schema:
+            self._emit(indent, "if len({}) > {!r}:".format(var, schema["maxLength"]))
+            self._raise(indent + 1, "{!r} is too long", [var], parts)
+        if "pattern" in schema:
+            self._emit(indent, "if not {}.search({}):".format(self._regex(schema["pattern"]), var))
+            self._raise(indent + 1, "{!r} does not match {!r}", [var, repr(schema["pattern"])], parts)
+
+    def _generate_number(self, schema, var, parts, indent, types):
+        keywords = ["minimum", "maximum", "multipleOf"]
+        if not any(keyword in schema for keyword in keywords):
+            return
+
+        indent = self._guard(indent, "number", var, types)
+        if indent is None:
+            return
+        if "minimum" in schema:
+            exclusive = schema.get("exclusiveMinimum", False)
+            self._emit(indent, "if {} {} {!r}:".format(var, "<=" if exclusive else "<", schema["minimum"]))
+            self._raise(indent + 1, "{!r} is less than " + ("or equal to " if exclusive else "") +
+                        "the minimum of {!r}", [var, repr(schema["minimum"])], parts)
+        if "maximum" in schema:
+            exclusive = schema.get("exclusiveMaximum", False)
+            self._emit(indent, "if {} {} {!r}:".format(var, ">=" if exclusive else ">", schema["maximum"]))
+            self._raise(indent + 1, "{!r} is greater than " + ("or equal to " if exclusive else "") +
+                        "the maximum of {!r}", [var, repr(schema["maximum"])], parts)
+        if "multipleOf" in schema:
+            self._emit(indent, "if _not_multiple_of({}, {!r}):".format(var, schema["multipleOf"]))
+            self._raise(indent + 1, "{!r} is not a multiple of {!r}", [var, repr(schema["multipleOf"])], parts)
+
+
+def compile_schema(schema, base_uri, documents):
+    """Compile a draft 4 schema, resolving references against the given documents, which are keyed by URI. Raises
+    UnsupportedSchema if the schema can't be compiled."""
+    return SchemaCompiler(base_uri, documents).compile(schema)
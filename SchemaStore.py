@@ -0,0 +1,120 @@
+# Copyright (C) 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import jsonref
+import jsonschema
+import os
+
+from threading import Lock
+from Config import VALIDATION_BACKENDS
+from SchemaCompiler import UnsupportedSchema, compile_schema
+
+
+class SchemaStore(object):
+    """
+    Loads the JSON schema files within a directory of a specification snapshot, reading and resolving each one at
+    most once. Snapshots never change once created, so the structures returned are shared between every user of the
+    store and must be copied before being modified.
+    """
+    def __init__(self, schema_dir):
+        self.schema_dir = schema_dir
+        self.base_uri = ("file:///" if os.name == "nt" else "file:") + schema_dir.replace("\\", "/") + "/"
+        self.files = {}
+        self.derefs = {}
+        self.uris = None
+        # Caches each file referenced by the RAML parser's schemas, so is discarded along with the store
+        self.loader = jsonref.JsonLoader()
+
+    def load(self, name):
+        """Get the contents of a schema file"""
+        if name not in self.files:
+            with open(os.path.join(self.schema_dir, name), 'r') as fh:
+                self.files[name] = json.load(fh)
+        return self.files[name]
+
+    def deref(self, name):
+        """Get the contents of a schema file, with any objects consisting only of a $ref replaced by the contents of
+        the file referred to"""
+        if name not in self.derefs:
+            self.derefs[name] = self.deref_schema(self.load(name))
+        return self.derefs[name]
+
+    def deref_schema(self, schema):
+        """Replace any objects consisting only of a $ref in a schema by the contents of the file referred to"""
+        if isinstance(schema, dict):
+            if len(schema) == 1 and "$ref" in schema:
+                return self.deref(schema["$ref"])
+            return {k: self.deref_schema(v) for k, v in schema.items()}
+        elif isinstance(schema, list):
+            return [self.deref_schema(x) for x in schema]
+        else:
+            return schema
+
+    def load_all(self):
+        """Get the contents of every schema file in the store, by URI"""
+        if self.uris is None:
+            uris = {}
+            for name in os.listdir(self.schema_dir):
+                if name.endswith(".json"):
+                    uris[self.base_uri + name] = self.load(name)
+            self.uris = uris
+        return self.uris
+
+    def compile_validator(self, schema, validator_class=None, backend="jsonschema"):
+        """Check a schema and create a validator for it, which resolves references to other schema files in this
+        store without reading them again. If no validator class is given, it is chosen based on the schema."""
+        self.load_all()
+
+        if not validator_class:
+            validator_class = jsonschema.validators.validator_for(schema)
+        validator_class.check_schema(schema)
+        if backend == "compiled" and validator_class is jsonschema.Draft4Validator:
+            try:
+                return compile_schema(schema, self.base_uri, self.uris)
+            except UnsupportedSchema:
+                pass
+        elif backend not in VALIDATION_BACKENDS:
+            raise ValueError("Unknown validation backend '{}'".format(backend))
+        return validator_class(schema, resolver=self._resolver(schema))
+
+    def copy_validator(self, validator):
+        """Create a jsonschema validator for the same, already checked, schema as another, with its own resolver so
+        that it may be used by a different thread"""
+        return type(validator)(validator.schema, resolver=self._resolver(validator.schema),
+                               format_checker=validator.format_checker)
+
+    def _resolver(self, schema):
+        return jsonschema.RefResolver(self.base_uri, schema, store=self.load_all())
+
+
+_stores = {}
+_stores_lock = Lock()
+
+
+def get_schema_store(schema_dir):
+    """Get the shared SchemaStore for a directory of schema files"""
+    schema_dir = os.path.abspath(schema_dir)
+    with _stores_lock:
+        if schema_dir not in _stores:
+            _stores[schema_dir] = SchemaStore(schema_dir)
+        return _stores[schema_dir]
+
+
+def forget_schema_stores(path):
+    """Discard the shared SchemaStores for the directories within a path, such as a snapshot which has been removed"""
+    path = os.path.abspath(path)
+    with _stores_lock:
+        for schema_dir in [x for x in _stores if x == path or x.startswith(path + os.sep)]:
+            del _stores[schema_dir]
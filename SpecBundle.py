@@ -0,0 +1,121 @@
+# Copyright (C) 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import pickle
+import time
+
+from threading import Lock
+from Config import SPECIFICATIONS, SPEC_BUNDLE_PATH
+from SpecRepos import SNAPSHOT_PATH, get_spec_snapshot
+
+
+# Incremented whenever the structure of the bundle or of the objects it contains changes
+BUNDLE_FORMAT = 1
+
+_bundle = None
+_bundle_lock = Lock()
+
+
+def build_spec_bundle(bundle_path=SPEC_BUNDLE_PATH):
+    """Parse every API and version in SPECIFICATIONS from the current snapshots and save them, along with the schema
+    files they refer to, to a single file which can be used without git or RAML parsing"""
+    from Specification import Specification
+
+    bundle = {"format": BUNDLE_FORMAT, "created": time.time(), "manifests": {}, "snapshots": {}}
+    for spec_key, spec_data in SPECIFICATIONS.items():
+        for version in spec_data["versions"]:
+            try:
+                commit, snapshot_path = get_spec_snapshot(spec_key, version)
+            except Exception as e:
+                print(" * ERROR: Unable to bundle '{}' {}: {}".format(spec_key, version, e))
+                continue
+
+            bundle["manifests"].setdefault(spec_key, {})[version] = commit
+            if (spec_key, commit) in bundle["snapshots"]:
+                continue
+
+            print(" * Bundling '{}' {} ({})".format(spec_key, version, commit))
+            snapshot = {"specs": {}, "files": {}}
+            for api_data in spec_data["apis"].values():
+                raml_path = os.path.join(snapshot_path, "APIs", api_data["raml"])
+                if os.path.exists(raml_path):
+                    snapshot["specs"][api_data["raml"]] = Specification(raml_path)
+
+            # Schema files are also loaded directly by some tests
+            schema_path = os.path.join(snapshot_path, "APIs", "schemas")
+            if os.path.exists(schema_path):
+                for file_name in os.listdir(schema_path):
+                    with open(os.path.join(schema_path, file_name), "rb") as f:
+                        snapshot["files"][os.path.join("APIs", "schemas", file_name)] = f.read()
+            bundle["snapshots"][(spec_key, commit)] = snapshot
+
+    with open(bundle_path + ".tmp", "wb") as f:
+        pickle.dump(bundle, f, pickle.HIGHEST_PROTOCOL)
+    os.replace(bundle_path + ".tmp", bundle_path)
+
+
+def _load_bundle():
+    global _bundle
+    with _bundle_lock:
+        if _bundle is None:
+            _bundle = {}
+            if SPEC_BUNDLE_PATH and os.path.exists(SPEC_BUNDLE_PATH):
+                try:
+                    with open(SPEC_BUNDLE_PATH, "rb") as f:
+                        bundle = pickle.load(f)
+                    if bundle.get("format") == BUNDLE_FORMAT:
+                        _bundle = bundle
+                    else:
+                        print(" * ERROR: Specification bundle '{}' was created by a different version of this tool"
+                              .format(SPEC_BUNDLE_PATH))
+                except Exception as e:
+                    print(" * ERROR: Unable to load specification bundle '{}': {}".format(SPEC_BUNDLE_PATH, e))
+        return _bundle
+
+
+def install_spec_bundle():
+    """Create snapshots from the specification bundle for any repository which hasn't been snapshotted, for example
+    because git or the network is unavailable"""
+    bundle = _load_bundle()
+    for spec_key, versions in bundle.get("manifests", {}).items():
+        manifest_file = os.path.join(SNAPSHOT_PATH, spec_key, "manifest.json")
+        if os.path.exists(manifest_file):
+            continue
+
+        print(" * Using bundled specifications for '{}'".format(spec_key))
+        if not os.path.exists(os.path.dirname(manifest_file)):
+            os.makedirs(os.path.dirname(manifest_file))
+        manifest = {}
+        for version, commit in versions.items():
+            snapshot_path = os.path.join(SNAPSHOT_PATH, spec_key, commit)
+            for file_path, contents in bundle["snapshots"][(spec_key, commit)]["files"].items():
+                file_path = os.path.join(snapshot_path, file_path)
+                if not os.path.exists(os.path.dirname(file_path)):
+                    os.makedirs(os.path.dirname(file_path))
+                with open(file_path, "wb") as f:
+                    f.write(contents)
+            manifest[version + ".x"] = commit
+
+        with open(manifest_file, "w") as f:
+            json.dump(manifest, f)
+
+
+def get_bundled_spec(spec_key, commit, raml):
+    """Get the parsed Specification of an API at a given commit from the bundle, or None if it isn't included"""
+    snapshot = _load_bundle().get("snapshots", {}).get((spec_key, commit))
+    if snapshot:
+        return snapshot["specs"].get(raml)
+    return None
@@ -0,0 +1,100 @@
+# Copyright (C) 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+
+from Config import CACHE_PATH
+
+
+# Parsed specifications are stored here, by repository and commit
+SPEC_CACHE_PATH = os.path.join(CACHE_PATH, "specs")
+
+# Calculated on first use
+PARSER_VERSION = None
+
+# Parsed specifications are shared between test runs in this process which use the same commit, by RAML file path and
+# commit
+SPEC_CACHE = {}
+
+
+def _parser_version():
+    """Identify the code used to parse specifications, so that cached results are discarded when it changes"""
+    import jsonref
+    import ramlfications
+
+    digest = hashlib.sha1()
+    # Every module whose output is stored in a parsed Specification, including the schemas it dereferences
+    for module_name in ["Specification.py", "Patches.py", "SchemaStore.py"]:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), module_name), "rb") as f:
+            digest.update(f.read())
+    for library in [ramlfications, jsonref]:
+        digest.update(getattr(library, "__version__", "").encode())
+    return digest.hexdigest()
+
+
+def _cache_file(spec_key, commit, raml):
+    global PARSER_VERSION
+    if PARSER_VERSION is None:
+        PARSER_VERSION = _parser_version()
+    key = hashlib.sha1("{}:{}".format(raml, PARSER_VERSION).encode()).hexdigest()
+    return os.path.join(SPEC_CACHE_PATH, spec_key, commit, key + ".pickle")
+
+
+def load_cached_spec(spec_key, commit, raml):
+    """Get a previously parsed Specification of an API at a given commit, or None if there isn't one"""
+    try:
+        with open(_cache_file(spec_key, commit, raml), "rb") as f:
+            return pickle.load(f)
+    except (IOError, EOFError, pickle.UnpicklingError):
+        return None
+    except Exception as e:
+        print(" * ERROR: Unable to load cached specification: {}".format(e))
+        return None
+
+
+def save_cached_spec(spec_key, commit, raml, spec):
+    """Store a parsed Specification of an API at a given commit"""
+    cache_file = _cache_file(spec_key, commit, raml)
+    try:
+        if not os.path.exists(os.path.dirname(cache_file)):
+            os.makedirs(os.path.dirname(cache_file))
+        # Write to a temporary file first so that a partial entry is never loaded
+        fd, temp_file = tempfile.mkstemp(dir=os.path.dirname(cache_file))
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(spec, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, cache_file)
+    except Exception as e:
+        print(" * ERROR: Unable to save parsed specification to the cache: {}".format(e))
+
+
+def forget_loaded_specs(path):
+    """Discard the parsed specifications held in memory for the RAML files within a path, such as a snapshot which
+    has been removed"""
+    path = os.path.abspath(path)
+    for spec_key in list(SPEC_CACHE):
+        if os.path.abspath(spec_key[0]).startswith(path + os.sep):
+            SPEC_CACHE.pop(spec_key, None)
+
+
+def prune_spec_cache(spec_key, commits):
+    """Discard parsed specifications of a repository for any commit other than those given"""
+    repo_cache_path = os.path.join(SPEC_CACHE_PATH, spec_key)
+    if os.path.exists(repo_cache_path):
+        for entry in os.listdir(repo_cache_path):
+            if entry not in commits:
+                shutil.rmtree(os.path.join(repo_cache_path, entry), ignore_errors=True)
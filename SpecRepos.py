@@ -0,0 +1,265 @@
+# Copyright 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import time
+
+from contextlib import contextmanager
+from threading import Thread
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from Config import CACHE_PATH, SPECIFICATIONS, SPEC_REFRESH_INTERVAL, ENABLE_SPEC_REFRESH, SPEC_SNAPSHOT_RETENTION
+from SpecCache import load_cached_spec, save_cached_spec, prune_spec_cache, forget_loaded_specs
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+
+# Read-only copies of each specification branch are exported here, keyed by commit, so that test runs never modify
+# the repositories themselves
+SNAPSHOT_PATH = os.path.join(CACHE_PATH, "snapshots")
+SNAPSHOT_BRANCH_PATTERN = re.compile(r"^v[0-9]+\.[0-9]+(\.x|-dev)$")
+SNAPSHOT_LOCK_FILE = ".lock"
+
+
+def _git():
+    """Import GitPython, which is slow to load, on first use. Returns None if Git isn't available, in which case only
+    bundled specifications can be used."""
+    try:
+        import git
+        return git
+    except ImportError:
+        return None
+
+
+def init_spec_repos():
+    """Clone or update the specification repositories used by the tests, in parallel. A repository which can't be
+    updated doesn't prevent the others from being used."""
+    if not os.path.exists(CACHE_PATH):
+        os.makedirs(CACHE_PATH)
+    if _git() is None:
+        print(" * ERROR: Git is not available, so the specification repositories can't be initialised")
+        return
+
+    with ThreadPoolExecutor(max_workers=len(SPECIFICATIONS)) as executor:
+        futures = {executor.submit(_init_spec_repo, repo_key): repo_key for repo_key in SPECIFICATIONS}
+        for future in as_completed(futures):
+            repo_key = futures[future]
+            try:
+                future.result()
+                print(" * Repository '{}' is ready".format(SPECIFICATIONS[repo_key]["repo"]))
+            except Exception as e:
+                print(" * ERROR: Unable to initialise repository '{}': {}".format(SPECIFICATIONS[repo_key]["repo"],
+                                                                                e))
+
+
+def start_spec_refresher():
+    """Keep the specification repositories up to date from a background thread. Snapshots of new commits are parsed
+    before being made available, so test runs which start afterwards use them without delay, while runs in progress
+    continue to use the snapshots they started with."""
+    if _git() is None or not ENABLE_SPEC_REFRESH:
+        return
+
+    def refresh():
+        while True:
+            time.sleep(SPEC_REFRESH_INTERVAL)
+            for repo_key in SPECIFICATIONS:
+                try:
+                    _init_spec_repo(repo_key, prepare=True)
+                except Exception as e:
+                    print(" * ERROR: Unable to refresh repository '{}': {}".format(SPECIFICATIONS[repo_key]["repo"],
+                                                                                 e))
+
+    t = Thread(target=refresh)
+    t.daemon = True
+    t.start()
+
+
+def _init_spec_repo(repo_key, prepare=False):
+    git = _git()
+    repo_data = SPECIFICATIONS[repo_key]
+    path = os.path.join(CACHE_PATH, repo_key)
+    last_pull_file = os.path.join(CACHE_PATH, repo_key + ".last_pull")
+
+    if not os.path.exists(path):
+        print(" * Initialising repository '{}'".format(repo_data["repo"]))
+        git.Repo.clone_from('https://github.com/AMWA-TV/' + repo_data["repo"] + '.git', path)
+        _write_last_pull(last_pull_file)
+    else:
+        # Prevent re-pulling of the spec repos too frequently
+        last_pull_time = 0
+        try:
+            with open(last_pull_file) as f:
+                last_pull_time = float(f.read())
+        except (IOError, ValueError):
+            pass
+
+        # Tests use snapshots of the remote branches, so fetching them is sufficient
+        if last_pull_time + SPEC_REFRESH_INTERVAL <= time.time():
+            print(" * Pulling latest files for repository '{}'".format(repo_data["repo"]))
+            try:
+                git.Repo(path).remotes.origin.fetch()
+                _write_last_pull(last_pull_file)
+            except git.exc.GitCommandError as e:
+                # Carry on using the copy we already have
+                print(" * ERROR: Unable to pull repository '{}': {}".format(repo_data["repo"], e))
+
+    _build_repo_snapshots(repo_key, prepare)
+
+
+def _write_last_pull(last_pull_file):
+    try:
+        with open(last_pull_file, "w") as f:
+            f.write(str(time.time()))
+    except IOError as e:
+        print(" * ERROR: Unable to write last pull time to file: {}".format(e))
+
+
+def build_spec_snapshots():
+    """Export the latest commit of each version branch of the specification repositories, recording which commit
+    each branch refers to in a manifest per repository"""
+    if _git() is None:
+        return
+    for repo_key in SPECIFICATIONS:
+        try:
+            _build_repo_snapshots(repo_key)
+        except Exception as e:
+            print(" * ERROR: Unable to create snapshots of repository '{}': {}".format(repo_key, e))
+
+
+def _build_repo_snapshots(repo_key, prepare=False):
+    repo = _git().Repo(os.path.join(CACHE_PATH, repo_key))
+    repo_snapshot_path = os.path.join(SNAPSHOT_PATH, repo_key)
+    os.makedirs(repo_snapshot_path, exist_ok=True)
+
+    # The snapshots are shared by every process using the cache, such as the web server and batch runs
+    with _snapshot_lock(repo_snapshot_path):
+        _update_repo_snapshots(repo, repo_key, repo_snapshot_path, prepare)
+
+
+@contextmanager
+def _snapshot_lock(repo_snapshot_path):
+    """Hold an exclusive lock on the snapshots of a repository while they're created or retired"""
+    with open(os.path.join(repo_snapshot_path, SNAPSHOT_LOCK_FILE), "a+") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # Only retried for ten seconds at a time
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _update_repo_snapshots(repo, repo_key, repo_snapshot_path, prepare):
+    # Imported here so that jsonschema is only loaded once it's needed
+    from SchemaStore import forget_schema_stores
+
+    manifest = {}
+    for ref in repo.remotes.origin.refs:
+        branch = ref.remote_head
+        if not SNAPSHOT_BRANCH_PATTERN.match(branch):
+            continue
+        commit = ref.commit.hexsha
+        path = os.path.join(repo_snapshot_path, commit)
+        if not os.path.exists(path):
+            print(" * Creating snapshot of repository '{}' branch '{}'".format(repo_key, branch))
+            # Export to a temporary directory first so that a partial snapshot is never used
+            temp_path = tempfile.mkdtemp(dir=repo_snapshot_path)
+            with tempfile.TemporaryFile() as archive:
+                repo.archive(archive, treeish=commit)
+                archive.seek(0)
+                with tarfile.open(fileobj=archive) as tar:
+                    tar.extractall(temp_path)
+            if prepare:
+                _parse_snapshot(repo_key, commit, temp_path)
+            os.rename(temp_path, path)
+        manifest[branch] = commit
+
+    # Replacing the manifest makes any new snapshots available to test runs which start from now on
+    manifest_file = os.path.join(repo_snapshot_path, "manifest.json")
+    with open(manifest_file + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(manifest_file + ".tmp", manifest_file)
+
+    # Snapshots which are no longer the head of any branch may still be in use by a test run, so are only discarded,
+    # along with their parsed specifications, once they have been unused for a while
+    retired_file = os.path.join(repo_snapshot_path, "retired.json")
+    retired = {}
+    try:
+        with open(retired_file) as f:
+            retired = json.load(f)
+    except (IOError, ValueError):
+        pass
+    for entry in os.listdir(repo_snapshot_path):
+        if entry in ["manifest.json", "retired.json", SNAPSHOT_LOCK_FILE] or entry in manifest.values():
+            retired.pop(entry, None)
+        elif entry not in retired:
+            retired[entry] = time.time()
+        elif retired[entry] + SPEC_SNAPSHOT_RETENTION <= time.time():
+            shutil.rmtree(os.path.join(repo_snapshot_path, entry), ignore_errors=True)
+            forget_schema_stores(os.path.join(repo_snapshot_path, entry))
+            forget_loaded_specs(os.path.join(repo_snapshot_path, entry))
+            retired.pop(entry)
+    with open(retired_file, "w") as f:
+        json.dump(retired, f)
+    prune_spec_cache(repo_key, list(manifest.values()) + list(retired.keys()))
+
+
+def _parse_snapshot(repo_key, commit, path):
+    """Parse each API in a new snapshot in advance, saving the results to the cache of parsed specifications"""
+    from Specification import Specification
+    from SchemaStore import forget_schema_stores
+
+    for api_data in SPECIFICATIONS[repo_key]["apis"].values():
+        raml_path = os.path.join(path, "APIs", api_data["raml"])
+        if os.path.exists(raml_path) and not load_cached_spec(repo_key, commit, api_data["raml"]):
+            save_cached_spec(repo_key, commit, api_data["raml"], Specification(raml_path))
+    # The snapshot is about to be moved, so the stores used to parse it won't be used again
+    forget_schema_stores(path)
+
+
+def get_spec_snapshot(repo_key, version):
+    """Get the commit and path of the snapshot of the specification branch which matches an API version"""
+    manifest_file = os.path.join(SNAPSHOT_PATH, repo_key, "manifest.json")
+    try:
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+    except (IOError, ValueError):
+        raise Exception("No snapshots of the '{}' repository were found. Please re-initialise the specification "
+                        "repositories.".format(repo_key))
+
+    for branch in [version + ".x", version + "-dev"]:
+        if branch in manifest:
+            return manifest[branch], os.path.join(SNAPSHOT_PATH, repo_key, manifest[branch])
+    raise Exception("No branch matching the expected patterns was found in the Git repository")
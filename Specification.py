@@ -13,10 +13,18 @@
 # limitations under the License.
 
 import os
-import json
 import ramlfications
 
+from collections import namedtuple
+from io import StringIO
+from threading import Lock, local
 from Patches import _parse_json
+from SchemaCompiler import CompiledValidator
+from SchemaStore import get_schema_store
+
+
+# The parts of a ramlfications URI parameter used by the tests. Unlike the ramlfications object, it can be pickled.
+URIParam = namedtuple("URIParam", ["name"])
 
 
 try:
@@ -31,15 +39,17 @@ class Specification(object):
         self.data = {}
         self.global_schemas = {}
 
-        self._fix_schemas(file_path)
-        api_raml = ramlfications.parse(file_path, "config.ini")
+        api_raml = ramlfications.parse(self._fix_schemas(file_path), "config.ini")
 
         self._extract_global_schemas(api_raml)
 
         # Iterate over each path+method defined in the API
         for resource in api_raml.resources:
+            params = None
+            if resource.uri_params:
+                params = [URIParam(param.name) for param in resource.uri_params]
             resource_data = {'method': resource.method,
-                             'params': resource.uri_params,
+                             'params': params,
                              'body': self._extract_body_schema(resource, file_path),
                              'responses': {}}
 
@@ -56,8 +66,75 @@ class Specification(object):
             # Register the collected data in the Specification object
             self.data[resource.path].append(resource_data)
 
+        self._build_indexes()
+
+    def _build_indexes(self):
+        """Index the parsed data for the lookups made by the tests. The indexes are derived from data, so are rebuilt
+        rather than pickled."""
+        schemas = {}
+        reads = []
+        writes = []
+        for path in self.data:
+            for method_def in self.data[path]:
+                method = method_def['method'].upper()
+                for response_code, schema in method_def['responses'].items():
+                    # The first definition of a method which has a schema for the response code takes precedence
+                    if schema and (method, path, response_code) not in schemas:
+                        schemas[(method, path, response_code)] = schema
+                if method_def['method'] in ['get', 'head', 'options']:
+                    reads.append((path, method_def))
+                elif method_def['method'] in ['post', 'put', 'patch', 'delete']:
+                    writes.append((path, method_def))
+        self._schemas = schemas
+        self._item_schemas = {}
+        for schema in schemas.values():
+            item_schema = self._extract_item_schema(schema)
+            if item_schema:
+                self._item_schemas[id(schema)] = item_schema
+        self._schema_ids = set(id(schema) for schema in schemas.values())
+        self._schema_ids.update(id(schema) for schema in self._item_schemas.values())
+        self._reads = tuple(sorted(reads, key=lambda x: x[0]))
+        self._writes = tuple(sorted(writes, key=lambda x: x[0]))
+
+        # Validators are checked and compiled once and shared between threads, but jsonschema validators track their
+        # position within referenced schemas in their resolver, so each thread has its own copy with its own resolver
+        self._shared_validators = {}
+        self._shared_validators_lock = Lock()
+        self._validators = local()
+
+    def _extract_item_schema(self, schema):
+        """Get a schema for the elements of an array schema, if they may be validated one at a time"""
+        array_keywords = ["additionalItems", "maxItems", "minItems", "uniqueItems", "allOf", "anyOf", "oneOf", "not",
+                          "enum", "$ref"]
+        if schema.get("type") != "array" or not isinstance(schema.get("items"), dict):
+            return None
+        if any(keyword in schema for keyword in array_keywords):
+            return None
+        item_schema = dict(schema["items"])
+        # The elements must be validated according to the same draft as the array
+        if "$schema" in schema:
+            item_schema.setdefault("$schema", schema["$schema"])
+        return item_schema
+
+    def __getstate__(self):
+        # Global schemas may contain lazily resolved references, which can't be pickled
+        def plain(obj):
+            if isinstance(obj, dict):
+                return {k: plain(v) for k, v in obj.items()}
+            elif isinstance(obj, list):
+                return [plain(x) for x in obj]
+            else:
+                return obj
+        return {"data": self.data, "global_schemas": plain(self.global_schemas)}
+
+    def __setstate__(self, state):
+        self.data = state["data"]
+        self.global_schemas = state["global_schemas"]
+        self._build_indexes()
+
     def _fix_schemas(self, file_path):
-        """Fixes RAML files to match ramlfications expectations (bugs)"""
+        """Fixes RAML files to match ramlfications expectations (bugs). Returns a file-like object containing the fixed
+        RAML, leaving the file itself unchanged."""
         lines = []
         in_schemas = False
         try:
@@ -74,10 +151,13 @@ class Specification(object):
                         line = "bugfix:\r\n"  # Work around issue with ramlfications utils.py '_remove_duplicates'
                     lines.append(line)
                     line = raml.readline()
-            with open(file_path, "w") as raml:
-                raml.writelines("".join(lines))
         except IOError as e:
             print("Error modifying RAML. Some schemas may not be loaded: {}".format(e))
+            return file_path
+
+        fixed_raml = StringIO("".join(lines))
+        fixed_raml.name = file_path  # Used by ramlfications to locate included files
+        return fixed_raml
 
     def _extract_global_schemas(self, api_raml):
         """Find schemas defined at the top of the RAML file and store them in global_schemas"""
@@ -128,50 +208,47 @@ class Specification(object):
     def _deref_schema(self, dir, name=None, schema=None):
         """Resolve $ref cases to the correct files in schema JSON"""
         # TODO: Is the python jsonschema RefResolver capable of doing this on its own?
-        def process(obj):
-            if isinstance(obj, dict):
-                if len(obj) == 1 and "$ref" in obj:
-                    return self._deref_schema(dir, name=obj['$ref'])
-                return {k: process(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [process(x) for x in obj]
-            else:
-                return obj
-
-        local = {}
+        store = get_schema_store(dir)
         if name:
-            filename = "{}/{}".format(dir, name)
-            with open(filename, 'r') as fh:
-                local = process(json.load(fh))
-            return local
+            return store.deref(name)
         else:
-            return process(schema)
+            return store.deref_schema(schema)
 
     def get_schema(self, method, path, response_code):
         """Get the response schema for a given method, path and response code if available"""
-        if path in self.data:
-            for response in self.data[path]:
-                if response["method"].upper() == method.upper():
-                    if response["responses"][response_code]:
-                        return response["responses"][response_code]
-        return None
+        return self._schemas.get((method.upper(), path, response_code))
+
+    def get_validator(self, schema, schema_dir, validator_class=None, backend="jsonschema"):
+        """Get a validator for a schema, resolving references to files in the given directory. Validators for the
+        response schemas of this Specification are checked and compiled once and re-used by every thread."""
+        if id(schema) not in self._schema_ids:
+            return get_schema_store(schema_dir).compile_validator(schema, validator_class, backend)
+
+        key = (id(schema), validator_class, backend)
+        with self._shared_validators_lock:
+            validator = self._shared_validators.get(key)
+        if validator is None:
+            validator = get_schema_store(schema_dir).compile_validator(schema, validator_class, backend)
+            with self._shared_validators_lock:
+                validator = self._shared_validators.setdefault(key, validator)
+        if isinstance(validator, CompiledValidator):
+            return validator
+
+        if not hasattr(self._validators, "cache"):
+            self._validators.cache = {}
+        if key not in self._validators.cache:
+            self._validators.cache[key] = get_schema_store(schema_dir).copy_validator(validator)
+        return self._validators.cache[key]
+
+    def get_item_schema(self, schema):
+        """Get the schema of each element of a response schema for an array, if it only constrains the elements, or
+        None otherwise"""
+        return self._item_schemas.get(id(schema))
 
     def get_reads(self):
-        """Get all API resources which support read based HTTP methods"""
-        resources = []
-        for resource in self.data:
-            for method_def in self.data[resource]:
-                if method_def['method'] in ['get', 'head', 'options']:
-                    resources.append((resource, method_def))
-        resources = sorted(resources, key=lambda x: x[0])
-        return resources
+        """Get all API resources which support read based HTTP methods, sorted by path"""
+        return self._reads
 
     def get_writes(self):
-        """Get all API resources which support write based HTTP methods"""
-        resources = []
-        for resource in self.data:
-            for method_def in self.data[resource]:
-                if method_def['method'] in ['post', 'put', 'patch', 'delete']:
-                    resources.append((resource, method_def))
-        resources = sorted(resources, key=lambda x: x[0])
-        return resources
+        """Get all API resources which support write based HTTP methods, sorted by path"""
+        return self._writes
@@ -0,0 +1,97 @@
+# Copyright (C) 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import ast
+import json
+import os
+
+from Config import CACHE_PATH
+
+
+# Test modules live alongside this file
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+CATALOGUE_FILE = os.path.join(CACHE_PATH, "test_catalogue.json")
+
+
+def _module_path(module_name):
+    return os.path.join(MODULE_DIR, module_name + ".py")
+
+
+def _find_tests(module_name, class_name, modules):
+    """Find the names of the test methods of a class, including any inherited from classes defined in other test
+    modules, without importing it. The path of each module read is added to modules."""
+    path = _module_path(module_name)
+    modules.add(path)
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+
+    imported_names = {}
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module and os.path.exists(_module_path(node.module)):
+            for alias in node.names:
+                imported_names[alias.asname or alias.name] = (node.module, alias.name)
+
+    tests = set()
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and node.name == class_name:
+            for item in node.body:
+                if isinstance(item, ast.FunctionDef) and item.name.startswith("test_"):
+                    tests.add(item.name)
+            for base in node.bases:
+                if isinstance(base, ast.Name):
+                    if base.id in imported_names:
+                        tests.update(_find_tests(imported_names[base.id][0], imported_names[base.id][1], modules))
+                    else:
+                        tests.update(_find_tests(module_name, base.id, modules))
+    return tests
+
+
+def _build_catalogue(test_definitions):
+    modules = set()
+    tests = {}
+    for test_id, test_def in test_definitions.items():
+        tests[test_id] = sorted(_find_tests(test_def["module"], test_def["class"], modules))
+    mtimes = {os.path.basename(path): os.path.getmtime(path) for path in modules}
+    return {"modules": mtimes, "tests": tests}
+
+
+def _is_current(catalogue, test_definitions):
+    if sorted(catalogue.get("tests", {})) != sorted(test_definitions):
+        return False
+    for module_name, mtime in catalogue.get("modules", {}).items():
+        path = os.path.join(MODULE_DIR, module_name)
+        if not os.path.exists(path) or os.path.getmtime(path) != mtime:
+            return False
+    return True
+
+
+def get_test_catalogue(test_definitions):
+    """Get the names of the tests provided by each test definition. These are found by reading the source of the
+    test modules rather than importing them, and are cached until any of those modules change."""
+    try:
+        with open(CATALOGUE_FILE) as f:
+            catalogue = json.load(f)
+        if _is_current(catalogue, test_definitions):
+            return catalogue["tests"]
+    except (IOError, ValueError):
+        pass
+
+    catalogue = _build_catalogue(test_definitions)
+    try:
+        os.makedirs(CACHE_PATH, exist_ok=True)
+        with open(CATALOGUE_FILE, "w") as f:
+            json.dump(catalogue, f)
+    except IOError as e:
+        print(" * ERROR: Unable to save the test catalogue: {}".format(e))
+    return catalogue["tests"]
@@ -0,0 +1,177 @@
+# Copyright 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import importlib
+
+from Config import SPECIFICATIONS, RESULT_STORE_PATH
+from ResultStore import ResultStore
+from TestResult import PREVIOUS_RESULT_NOTE
+
+
+# Definitions of each set of tests made available from the dropdowns. Test modules are only imported when a test run
+# requires them, which avoids loading every module's dependencies at startup.
+TEST_DEFINITIONS = {
+    "IS-04-01": {
+        "name": "IS-04 Node API",
+        "specs": [{
+            "spec_key": "is-04",
+            "api_key": "node"
+        }],
+        "module": "IS0401Test",
+        "class": "IS0401Test"
+    },
+    "IS-04-02": {
+        "name": "IS-04 Registry APIs",
+        "specs": [{
+            "spec_key": "is-04",
+            "api_key": "registration"
+        }, {
+            "spec_key": "is-04",
+            "api_key": "query"
+        }],
+        "module": "IS0402Test",
+        "class": "IS0402Test"
+    },
+    "IS-05-01": {
+        "name": "IS-05 Connection Management API",
+        "specs": [{
+            "spec_key": 'is-05',
+            "api_key": "connection"
+        }],
+        "module": "IS0501Test",
+        "class": "IS0501Test"
+    },
+    "IS-05-02": {
+        "name": "IS-05 Interaction with Node API",
+        "specs": [{
+            "spec_key": "is-04",
+            "api_key": "node"
+        }, {
+            "spec_key": "is-05",
+            "api_key": "connection"
+        }],
+        "module": "IS0502Test",
+        "class": "IS0502Test"
+    },
+    "IS-06-01": {
+        "name": "IS-06 Network Control API",
+        "specs": [{
+            "spec_key": 'is-06',
+            "api_key": "netctrl"
+        }],
+        "module": "IS0601Test",
+        "class": "IS0601Test"
+    },
+    "IS-07-01": {
+        "name": "IS-07 Event & Tally API",
+        "specs": [{
+            "spec_key": 'is-07',
+            "api_key": "events"
+        }],
+        "module": "IS0701Test",
+        "class": "IS0701Test"
+    },
+    "IS-08-01": {
+        "name": "IS-08 Channel Mapping API",
+        "specs": [{
+            "spec_key": 'is-08',
+            "api_key": "channelmapping"
+        }],
+        "module": "IS0801Test",
+        "class": "IS0801Test"
+    }
+}
+
+
+def load_test_class(test_id):
+    """Import the module defining a set of tests and return its test class"""
+    test_def = TEST_DEFINITIONS[test_id]
+    return getattr(importlib.import_module(test_def["module"]), test_def["class"])
+
+
+def build_apis(test_id, endpoints):
+    """Construct the API definitions for a test from a list of endpoints, each a dict of 'ip', 'port' and 'version'"""
+    apis = {}
+    for spec, endpoint in zip(TEST_DEFINITIONS[test_id]["specs"], endpoints):
+        base_url = "http://{}:{}".format(endpoint["ip"], str(endpoint["port"]))
+        version = endpoint["version"]
+
+        spec_key = spec["spec_key"]
+        api_key = spec["api_key"]
+        apis[api_key] = {
+            "raml": SPECIFICATIONS[spec_key]["apis"][api_key]["raml"],
+            "base_url": base_url,
+            "url": "{}/x-nmos/{}/{}/".format(base_url, api_key, version),
+            "spec_key": spec_key,
+            "spec_path": None,  # Set to the specification snapshot inside GenericTest
+            "version": version,
+            "spec": None  # Used inside GenericTest
+        }
+    return apis
+
+
+def run_test(test_id, apis, test_selection="all", sessions=None, job=None, validation_backend=None, archive=None,
+             validation_processes=None):
+    """Instantiate and run a set of tests, returning the results as a list. If a Job is given, it is attached to the
+    test object so that results can be followed as they are produced. The validation backend and number of validation
+    processes default to those set in the Config. If a TrafficArchive is given, the HTTP traffic with the APIs under
+    test is recorded to it, or replayed from it in place of the APIs."""
+    # Imported with the test modules, which load Requests and the other test dependencies only once a run starts
+    import TestHelper
+
+    test_class = load_test_class(test_id)
+    base_urls = [api["base_url"] for api in apis.values()]
+    if archive:
+        TestHelper.attach_archive(base_urls, archive)
+    try:
+        if test_id == "IS-04-01":
+            # This test has an unusual constructor as it requires a registry instance
+            session = sessions.acquire()
+            try:
+                test_obj = test_class(apis, session.registry, session.node)
+                return execute_test(test_obj, test_id, apis, test_selection, job, validation_backend,
+                                    validation_processes)
+            finally:
+                sessions.release(session)
+        else:
+            test_obj = test_class(apis)
+            return execute_test(test_obj, test_id, apis, test_selection, job, validation_backend,
+                                validation_processes)
+    finally:
+        if archive:
+            TestHelper.detach_archive(base_urls)
+
+
+def execute_test(test_obj, test_id, apis, test_selection, job, validation_backend=None, validation_processes=None):
+    """Run an instantiated set of tests, recording the results in the result store if one is configured"""
+    if validation_backend:
+        test_obj.validation_backend = validation_backend
+    if validation_processes is not None:
+        test_obj.validation_processes = validation_processes
+    if job:
+        job.attach(test_obj, test_selection)
+
+    store = None
+    if RESULT_STORE_PATH:
+        store = ResultStore(RESULT_STORE_PATH)
+        if test_selection == "rerun":
+            test_obj.previous_results = store.load(test_id, apis)
+
+    results = test_obj.run_tests(test_selection)
+
+    if store:
+        # Results carried over from a previous run are already stored
+        store.save(test_id, apis, [x for x in results if not x[2].startswith(PREVIOUS_RESULT_NOTE)],
+                   test_obj.incomplete_tests)
+    return results
@@ -15,8 +15,27 @@
 # limitations under the License.
 
 
+import codecs
+import json
 import requests
 
+from contextlib import contextmanager
+from http.cookiejar import DefaultCookiePolicy
+from threading import Lock
+from urllib.parse import urlsplit
+from Config import HTTP_TIMEOUT, HTTP_POOL_SIZE
+
+
+# Number of bytes read at a time when parsing a streamed response
+STREAM_CHUNK_SIZE = 65536
+
+# Sessions kept open for re-use, by target, along with the number of test runs using each
+_sessions = {}
+_sessions_lock = Lock()
+
+# Archives recording or replaying the traffic with each target
+_archives = {}
+
 
 def ordered(obj):
     if isinstance(obj, dict):
@@ -32,17 +51,113 @@ def compare_json(json1, json2):
     return ordered(json1) == ordered(json2)
 
 
-def do_request(method, url, data=None):
-    """Perform a basic HTTP request with appropriate error handling"""
+def _target(url):
+    parts = urlsplit(url)
+    return parts.scheme, parts.hostname, parts.port
+
+
+def _new_session():
+    s = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    # Each request is made as if by a new client, as was the case before sessions were re-used
+    s.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return s
+
+
+def open_sessions(urls):
+    """Keep connections to the hosts of the given URLs open for re-use by requests made to them, until close_sessions
+    is called with the same URLs"""
+    with _sessions_lock:
+        for target in set(_target(url) for url in urls):
+            if target not in _sessions:
+                _sessions[target] = [_new_session(), 0]
+            _sessions[target][1] += 1
+
+
+def close_sessions(urls):
+    """Close the connections kept open by open_sessions, once no other test run is using them"""
+    with _sessions_lock:
+        for target in set(_target(url) for url in urls):
+            if target in _sessions:
+                _sessions[target][1] -= 1
+                if _sessions[target][1] == 0:
+                    _sessions.pop(target)[0].close()
+
+
+def attach_archive(urls, archive):
+    """Record the requests made to the hosts of the given URLs, and their responses, to a TrafficArchive, or serve
+    responses from it if it is being replayed, until detach_archive is called with the same URLs"""
+    with _sessions_lock:
+        for target in set(_target(url) for url in urls):
+            _archives[target] = archive
+
+
+def detach_archive(urls):
+    with _sessions_lock:
+        for target in set(_target(url) for url in urls):
+            _archives.pop(target, None)
+
+
+@contextmanager
+def _session(url, stream=False):
+    """Get the open session for the host of a URL, or a new session which is closed after use if there isn't one"""
+    with _sessions_lock:
+        entry = _sessions.get(_target(url))
+    if entry:
+        yield entry[0]
+    elif stream:
+        # The connection used by a streamed response is released when the response is closed
+        yield _new_session()
+    else:
+        s = _new_session()
+        try:
+            yield s
+        finally:
+            s.close()
+
+
+def _archive(url):
+    """Get the archive attached to the host of a URL, if any"""
+    with _sessions_lock:
+        return _archives.get(_target(url))
+
+
+def request(method, url, **kwargs):
+    """Perform an HTTP request in the same way as requests.request, re-using any open connection to the host"""
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+    stream = kwargs.get("stream", False)
+
+    def send():
+        with _session(url, stream) as s:
+            return s.request(method, url, **kwargs)
+
+    archive = _archive(url)
+    if archive:
+        # The request is only prepared here to identify it within the archive
+        request_args = {k: v for k, v in kwargs.items() if k in ["params", "data", "json", "headers"]}
+        return archive.exchange(requests.Request(method, url, **request_args).prepare(), send, stream)
+    return send()
+
+
+def do_request(method, url, data=None, timeout=HTTP_TIMEOUT, stream=False):
+    """Perform a basic HTTP request with appropriate error handling. If stream is set, the body is read as it is
+    used, and the response must be closed once finished with."""
     try:
-        s = requests.Session()
         req = None
         if data is not None:
             req = requests.Request(method, url, json=data)
         else:
             req = requests.Request(method, url)
         prepped = req.prepare()
-        r = s.send(prepped)
+
+        def send():
+            with _session(url, stream) as s:
+                return s.send(prepped, timeout=timeout, stream=stream)
+
+        archive = _archive(url)
+        r = archive.exchange(prepped, send, stream) if archive else send()
         return True, r
     except requests.exceptions.Timeout:
         return False, "Connection timeout"
@@ -52,3 +167,77 @@ def do_request(method, url, data=None):
         return False, str(e)
     except requests.exceptions.RequestException as e:
         return False, str(e)
+
+
+class NotAnArray(ValueError):
+    """Raised by iter_json_array for a body containing JSON which isn't an array"""
+    pass
+
+
+def iter_json_array(response, chunk_size=STREAM_CHUNK_SIZE):
+    """Parse the body of a streamed response containing a JSON array, yielding each element as soon as it has been
+    read, so that only one element is held in memory at a time. Raises a JSONDecodeError if the body isn't valid
+    JSON, a UnicodeDecodeError if it isn't UTF-8, or NotAnArray if it isn't an array."""
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    chunks = response.iter_content(chunk_size)
+    buffer = ""
+    pos = 0
+    finished = False
+
+    def skip_whitespace():
+        nonlocal buffer, pos, finished
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buffer) or finished:
+                return
+            read_more()
+
+    def read_more():
+        nonlocal buffer, pos, finished
+        chunk = next(chunks, None)
+        if chunk is None:
+            buffer = buffer[pos:] + text_decoder.decode(b"", final=True)
+            finished = True
+        else:
+            buffer = buffer[pos:] + text_decoder.decode(chunk)
+        pos = 0
+
+    skip_whitespace()
+    if pos == len(buffer):
+        raise json.JSONDecodeError("Expecting value", buffer, pos)
+    if buffer[pos:pos + 1] != "[":
+        raise NotAnArray("Response is not a JSON array")
+    pos += 1
+
+    skip_whitespace()
+    if buffer[pos:pos + 1] == "]":
+        return
+    while True:
+        # Elements are only complete once the delimiter following them has been read, as a number could otherwise be
+        # the start of a longer one
+        try:
+            element, end = decoder.raw_decode(buffer, pos)
+            complete = finished or (end < len(buffer) and buffer[end] in ",] \t\r\n")
+        except json.JSONDecodeError:
+            if finished:
+                raise
+            complete = False
+        if not complete:
+            read_more()
+            continue
+        yield element
+
+        pos = end
+        skip_whitespace()
+        if buffer[pos:pos + 1] == "]":
+            pos += 1
+            skip_whitespace()
+            if pos < len(buffer):
+                raise json.JSONDecodeError("Extra data", buffer, pos)
+            return
+        if buffer[pos:pos + 1] != ",":
+            raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+        pos += 1
+        skip_whitespace()
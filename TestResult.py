@@ -15,6 +15,11 @@
 import inspect
 import time
 
+
+# Prefix added to the detail of results which were carried over from a previous test run
+PREVIOUS_RESULT_NOTE = "Result from a previous run."
+
+
 class Test(object):
     def __init__(self, description, name=None):
         self.description = description
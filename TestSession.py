@@ -0,0 +1,88 @@
+# Copyright (C) 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from threading import Thread, Lock
+from queue import Queue
+
+from flask import Flask
+from werkzeug.serving import make_server
+
+from Registry import Registry, REGISTRY_API
+from Node import Node, NODE_API
+
+
+class TestSession(object):
+    """
+    An isolated mock Registry and Node, served from their own port.
+    Allows several devices to be tested at once without sharing mock state.
+    """
+    def __init__(self, port):
+        self.port = port
+        self.registry = None
+        self.node = None
+        self.server = None
+
+    def start(self):
+        """Start serving the mock APIs. A port of 0 selects any free port."""
+        if self.server:
+            return
+
+        app = Flask(__name__)
+        app.register_blueprint(REGISTRY_API)
+        app.register_blueprint(NODE_API)
+
+        self.server = make_server('0.0.0.0', self.port, app, threaded=True)
+        self.port = self.server.port
+
+        self.registry = Registry(self.port)
+        self.node = Node(self.port)
+        app.config['REGISTRY'] = self.registry
+
+        t = Thread(target=self.server.serve_forever)
+        t.daemon = True
+        t.start()
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server = None
+
+
+class TestSessionPool(object):
+    """A fixed set of TestSessions which are handed out to test runs one at a time"""
+    def __init__(self, ports):
+        self.sessions = [TestSession(port) for port in ports]
+        self.available = Queue()
+        self.lock = Lock()
+        self.started = False
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            for session in self.sessions:
+                session.start()
+                self.available.put(session)
+            self.started = True
+
+    def acquire(self):
+        """Get a free TestSession, waiting for one to be released if necessary"""
+        self.start()
+        session = self.available.get()
+        session.registry.reset()
+        return session
+
+    def release(self, session):
+        session.registry.disable()
+        self.available.put(session)
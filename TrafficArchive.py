@@ -0,0 +1,186 @@
+# Copyright (C) 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import json
+import time
+import requests
+
+from collections import deque
+from datetime import timedelta
+from threading import Lock, local
+from requests.structures import CaseInsensitiveDict
+
+
+# Requests which each thread has made that couldn't be answered from an archive being replayed
+_replay_misses = local()
+
+
+def clear_replay_misses():
+    """Forget the requests which couldn't be replayed, before starting a test in this thread"""
+    _replay_misses.requests = []
+
+
+def get_replay_misses():
+    """Get the requests made by this thread since clear_replay_misses which couldn't be answered by an archive being
+    replayed, such as writes whose bodies differ from those recorded"""
+    return getattr(_replay_misses, "requests", [])
+
+
+def _encode_body(body):
+    """Convert a request or response body to a JSON value and whether it was base64 encoded"""
+    if body is None:
+        return None, False
+    if isinstance(body, str):
+        return body, False
+    try:
+        return body.decode("utf-8"), False
+    except UnicodeDecodeError:
+        return base64.b64encode(body).decode("ascii"), True
+
+
+def _decode_body(body, is_base64):
+    if body is None:
+        return b""
+    if is_base64:
+        return base64.b64decode(body)
+    return body.encode("utf-8")
+
+
+def _request_key(prepped):
+    body, is_base64 = _encode_body(prepped.body)
+    return prepped.method.upper(), prepped.url, body
+
+
+class TrafficArchive(object):
+    """A file recording each HTTP request made to the APIs under test during a test run, along with its response,
+    one JSON object per line. An archive opened for replay serves the recorded responses in place of the APIs, so
+    that a run can be repeated without the devices which were tested, for example to judge them against a newer
+    specification."""
+    def __init__(self, path, replay=False):
+        self.path = path
+        self.replaying = replay
+        self._lock = Lock()
+        self._file = None
+        self._responses = {}
+
+        if replay:
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        key = (entry["method"], entry["url"], entry["request_body"])
+                        self._responses.setdefault(key, deque()).append(entry)
+        else:
+            self._file = open(path, "w")
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def exchange(self, prepped, send, stream=False):
+        """Perform a prepared request by calling send, recording the response or exception, or serve the recorded
+        response to an identical request when replaying. Streamed responses are read in full before being recorded."""
+        if self.replaying:
+            return self._replay(prepped)
+
+        start = time.time()
+        try:
+            response = send()
+            if stream:
+                response.content
+        except requests.exceptions.RequestException as e:
+            self._record(prepped, prepped, start, error=e)
+            raise
+        # After a redirect, the response refers to the last request made, but replays must match the first
+        sent = response.history[0].request if response.history else response.request
+        self._record(prepped, sent or prepped, start, response=response)
+        return response
+
+    def _record(self, prepped, sent, start, response=None, error=None):
+        request_body, request_base64 = _encode_body(prepped.body)
+        entry = {
+            "time": start,
+            "method": prepped.method.upper(),
+            "url": prepped.url,
+            "request_headers": dict(sent.headers),
+            "request_body": request_body,
+            "request_base64": request_base64,
+            "elapsed": time.time() - start,
+            "error": None
+        }
+        if response is not None:
+            body, is_base64 = _encode_body(response.content)
+            entry.update({
+                "status": response.status_code,
+                "reason": response.reason,
+                "headers": dict(response.headers),
+                "body": body,
+                "base64": is_base64,
+                "elapsed": response.elapsed.total_seconds(),
+                "final_url": response.url,
+                "history": [{"status": redirect.status_code, "reason": redirect.reason, "url": redirect.url,
+                             "headers": dict(redirect.headers)} for redirect in response.history]
+            })
+        else:
+            entry["error"] = {"type": type(error).__name__, "message": str(error)}
+
+        with self._lock:
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+
+    def _replay(self, prepped):
+        """Get the next recorded response to a request. Once the responses to a request have been used up, the last
+        is served again, as when polling for a change which the device had already made."""
+        key = _request_key(prepped)
+        with self._lock:
+            entries = self._responses.get(key)
+            if not entries:
+                # Writes often contain generated values, such as ports, IDs and times, so are unlikely to match
+                get_replay_misses().append("{} {}".format(key[0], key[1]))
+                raise requests.exceptions.ConnectionError("No response to {} {} recorded in {}".format(
+                    key[0], key[1], self.path))
+            entry = entries.popleft() if len(entries) > 1 else entries[0]
+
+        if entry["error"]:
+            # Errors are raised as the same type of exception, so that they're reported as they were when recorded
+            error_class = getattr(requests.exceptions, entry["error"]["type"], requests.exceptions.RequestException)
+            raise error_class(entry["error"]["message"])
+
+        response = self._response(entry["status"], entry["reason"], entry["headers"],
+                                  entry.get("final_url", prepped.url), _decode_body(entry["body"], entry["base64"]))
+        response.request = prepped
+        response.elapsed = timedelta(seconds=entry["elapsed"])
+        response.history = [self._response(redirect["status"], redirect["reason"], redirect["headers"],
+                                           redirect["url"], b"") for redirect in entry.get("history", [])]
+        return response
+
+    def _response(self, status, reason, headers, url, content):
+        response = requests.Response()
+        response.status_code = status
+        response.reason = reason
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = url
+        # The body has already been decoded, so is served as if it had been read from the connection
+        response._content = content
+        response._content_consumed = True
+        return response
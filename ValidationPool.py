@@ -0,0 +1,105 @@
+# Copyright (C) 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import multiprocessing
+import os
+import pickle
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from threading import Lock
+from Config import VALIDATION_PROCESSES, VALIDATION_SHARD_SIZE
+from SchemaStore import get_schema_store
+
+
+_pool = None
+_pool_lock = Lock()
+
+# Validators created within each worker process, by schema
+_worker_validators = {}
+
+
+def _processes(processes=None):
+    if processes is None:
+        processes = VALIDATION_PROCESSES
+    return os.cpu_count() if processes is None else processes
+
+
+def _get_pool():
+    """Get the process pool shared by all tests, starting it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Tests run in many threads, so forking from them could copy a lock while it is held
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool = ProcessPoolExecutor(_processes(), mp_context=context)
+        return _pool
+
+
+def _validate_shard(schema_key, schema_dir, schema, backend, start, entries):
+    """Validate a list of array elements within a worker process, returning the index, location and message of the
+    first error found in each invalid element"""
+    if schema_key not in _worker_validators:
+        _worker_validators[schema_key] = get_schema_store(schema_dir).compile_validator(schema, backend=backend)
+    validator = _worker_validators[schema_key]
+
+    errors = []
+    for index, entry in enumerate(entries, start):
+        error = next(validator.iter_errors(entry), None)
+        if error:
+            errors.append((index, list(error.path), error.message))
+    return errors
+
+
+def _iter_local_errors(entries, validator, start=0):
+    for index, entry in enumerate(entries, start):
+        error = next(validator.iter_errors(entry), None)
+        if error:
+            yield index, list(error.path), error.message
+
+
+def iter_array_errors(entries, validator, schema_dir, schema, backend="jsonschema", processes=None):
+    """Validate each element of an array as it is read from an iterable, yielding the index, location and message of
+    the first error found in each invalid element, in order. Once an array is found to be larger than
+    VALIDATION_SHARD_SIZE, it is split into shards of that size which are validated in parallel by a pool of
+    processes. Otherwise, and if fewer than two validation processes are allowed, the validator given is used within
+    this process. The number of processes defaults to VALIDATION_PROCESSES."""
+    processes = _processes(processes)
+    entries = iter(entries)
+    shard = list(islice(entries, VALIDATION_SHARD_SIZE))
+    if len(shard) < VALIDATION_SHARD_SIZE or processes < 2:
+        yield from _iter_local_errors(shard, validator)
+        yield from _iter_local_errors(entries, validator, len(shard))
+        return
+
+    pool = _get_pool()
+    schema_key = (schema_dir, backend, hashlib.sha1(pickle.dumps(schema)).hexdigest())
+    pending = deque()
+    start = 0
+    try:
+        while shard:
+            pending.append(pool.submit(_validate_shard, schema_key, schema_dir, schema, backend, start, shard))
+            start += len(shard)
+            # Limit the number of elements read ahead of those which have been validated
+            while len(pending) > processes * 2:
+                yield from pending.popleft().result()
+            shard = list(islice(entries, VALIDATION_SHARD_SIZE))
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,311 @@
+# Copyright (C) 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+from SpecRepos import init_spec_repos, build_spec_snapshots
+from SpecBundle import install_spec_bundle
+from Config import VALIDATION_BACKENDS
+from TestDefinitions import TEST_DEFINITIONS, build_apis, run_test
+from TrafficArchive import TrafficArchive
+
+
+# Mock Registry/Node sessions for IS-04 Node tests, created on demand within each worker process
+SESSIONS = None
+
+
+def execute_run(run):
+    """Perform a single test run from the manifest, returning a dict describing its results"""
+    global SESSIONS
+
+    test_id = run["test"]
+    test_selection = run.get("selection", "all")
+    output = {
+        "test": test_id,
+        "device": run.get("device"),
+        "endpoints": run["endpoints"],
+        "selection": test_selection,
+        "result": [],
+        "error": None,
+        "started": time.time(),
+        "duration": 0
+    }
+
+    archive = None
+    try:
+        apis = build_apis(test_id, run["endpoints"])
+        if test_id == "IS-04-01" and SESSIONS is None:
+            # Imported here so that Flask is only loaded by processes which need a mock Registry
+            from TestSession import TestSessionPool
+            SESSIONS = TestSessionPool([0])
+        if run.get("record"):
+            archive = TrafficArchive(run["record"])
+        elif run.get("replay"):
+            archive = TrafficArchive(run["replay"], replay=True)
+        # Runs are already spread across a process per CPU, so each validates its responses within its own process
+        output["result"] = run_test(test_id, apis, test_selection, SESSIONS, validation_backend=run.get("validator"),
+                                    archive=archive, validation_processes=0)
+    except Exception as e:
+        print(" * ERROR: Test run {} failed: {}".format(test_id, e))
+        output["error"] = str(e)
+    finally:
+        if archive:
+            archive.close()
+
+    output["duration"] = time.time() - output["started"]
+    return output
+
+
+def load_manifest(manifest_file):
+    """Load and check a run manifest, returning the list of runs it contains"""
+    with open(manifest_file) as f:
+        manifest = json.load(f)
+
+    runs = manifest["runs"]
+    for index, run in enumerate(runs):
+        if run.get("test") not in TEST_DEFINITIONS:
+            raise ValueError("Run {} refers to an unknown test '{}'".format(index, run.get("test")))
+        if len(run.get("endpoints", [])) != len(TEST_DEFINITIONS[run["test"]]["specs"]):
+            raise ValueError("Run {} requires {} endpoint(s) for test '{}'".format(
+                index, len(TEST_DEFINITIONS[run["test"]]["specs"]), run["test"]))
+        if run.get("validator", VALIDATION_BACKENDS[0]) not in VALIDATION_BACKENDS:
+            raise ValueError("Run {} refers to an unknown validator '{}'".format(index, run["validator"]))
+        if run.get("record") and run.get("replay"):
+            raise ValueError("Run {} can't both record and replay traffic".format(index))
+    return runs
+
+
+def load_inventory(inventory_file, test_ids=None):
+    """Load a device inventory and return a run for each test whose APIs are all provided by a device.
+
+    CSV inventories have the columns 'device', 'api', 'url' and 'version', with one row per API of each device.
+    YAML inventories contain a list of 'devices', each with a 'name' and a mapping of 'apis' to their 'url' and
+    'version'."""
+    devices = {}
+    if inventory_file.endswith(".yaml") or inventory_file.endswith(".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("PyYAML must be installed to read YAML inventories")
+        with open(inventory_file) as f:
+            inventory = yaml.safe_load(f)
+        for device in inventory["devices"]:
+            devices[device["name"]] = device["apis"]
+    else:
+        with open(inventory_file) as f:
+            for row in csv.DictReader(f):
+                devices.setdefault(row["device"], {})[row["api"]] = {"url": row["url"], "version": row["version"]}
+
+    runs = []
+    for device_name, device_apis in devices.items():
+        for test_id in sorted(TEST_DEFINITIONS):
+            if test_ids and test_id not in test_ids:
+                continue
+            specs = TEST_DEFINITIONS[test_id]["specs"]
+            if not all(spec["api_key"] in device_apis for spec in specs):
+                continue
+            endpoints = []
+            for spec in specs:
+                api = device_apis[spec["api_key"]]
+                url = urlparse(api["url"])
+                endpoints.append({"ip": url.hostname, "port": url.port or 80, "version": api["version"]})
+            runs.append({"test": test_id, "device": device_name, "endpoints": endpoints})
+    return runs
+
+
+def archive_name(run):
+    """Get the name of the file used to record the traffic of a run, by default"""
+    parts = [run["device"]] if run.get("device") else []
+    parts.append(run["test"])
+    parts += ["{}_{}".format(endpoint["ip"], endpoint["port"]) for endpoint in run["endpoints"]]
+    return "-".join(parts) + ".jsonl"
+
+
+def run_manifest(runs, workers, per_device=None):
+    """Execute runs in parallel worker processes, returning their outputs in manifest order. At most per_device runs
+    for any one device are executed at a time."""
+    outputs = [None] * len(runs)
+    pending = list(range(len(runs)))
+    running = {}
+    device_counts = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while len(pending) > 0 or len(running) > 0:
+            # Only submit as many runs as there are workers, so that the per-device limit holds
+            for index in list(pending):
+                if len(running) >= workers:
+                    break
+                device = runs[index].get("device")
+                if per_device and device and device_counts.get(device, 0) >= per_device:
+                    continue
+                device_counts[device] = device_counts.get(device, 0) + 1
+                running[executor.submit(execute_run, runs[index])] = index
+                pending.remove(index)
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                device_counts[runs[index].get("device")] -= 1
+                outputs[index] = future.result()
+                print(" * Completed {} of {}: {}".format(len([x for x in outputs if x]), len(runs),
+                                                         run_name(outputs[index])))
+    return outputs
+
+
+def build_report(outputs):
+    """Aggregate the results of many runs into per-device and per-test totals"""
+    report = {"devices": {}, "tests": {}, "runs": outputs}
+    for output in outputs:
+        device = output["device"] or run_name(output)
+        device_totals = report["devices"].setdefault(device, {"runs": 0, "errors": 0, "results": {}})
+        device_totals["runs"] += 1
+        if output["error"]:
+            device_totals["errors"] += 1
+        for result in output["result"]:
+            if result[3] in ["__init__", "run_tests"]:
+                continue
+            device_totals["results"][result[1]] = device_totals["results"].get(result[1], 0) + 1
+
+            # Automatically defined tests are numbered in the order they run, so are identified by description
+            test_key = "{} {}".format(output["test"], result[0] if result[3].startswith("auto_") else result[3])
+            test_totals = report["tests"].setdefault(test_key, {"description": result[0], "results": {},
+                                                                "failed_devices": []})
+            test_totals["results"][result[1]] = test_totals["results"].get(result[1], 0) + 1
+            if result[1] == "Fail":
+                test_totals["failed_devices"].append(device)
+    return report
+
+
+def run_name(output):
+    urls = ["{}:{}".format(endpoint["ip"], endpoint["port"]) for endpoint in output["endpoints"]]
+    if output.get("device"):
+        return "{} {} ({})".format(output["device"], output["test"], ", ".join(urls))
+    return "{} ({})".format(output["test"], ", ".join(urls))
+
+
+def write_junit(outputs, junit_file):
+    """Write results in the JUnit XML format understood by most CI systems"""
+    testsuites = ET.Element("testsuites")
+    for output in outputs:
+        testsuite = ET.SubElement(testsuites, "testsuite", name=run_name(output))
+        failures = 0
+        skipped = 0
+        for result in output["result"]:
+            testcase = ET.SubElement(testsuite, "testcase", classname=output["test"], name=result[3],
+                                     time=result[4].rstrip("s"))
+            testcase.set("description", result[0])
+            if result[1] == "Fail":
+                ET.SubElement(testcase, "failure", message=result[2])
+                failures += 1
+            elif result[1] in ["Manual", "N/A"]:
+                ET.SubElement(testcase, "skipped", message="{}: {}".format(result[1], result[2]))
+                skipped += 1
+        errors = 0
+        if output["error"]:
+            ET.SubElement(testsuite, "error", message=output["error"])
+            errors = 1
+        testsuite.set("tests", str(len(output["result"])))
+        testsuite.set("failures", str(failures))
+        testsuite.set("skipped", str(skipped))
+        testsuite.set("errors", str(errors))
+        testsuite.set("time", "{0:.3f}".format(output["duration"]))
+    ET.ElementTree(testsuites).write(junit_file, encoding="utf-8", xml_declaration=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run NMOS test suites without the web interface")
+    parser.add_argument("manifest", nargs="?", help="JSON file listing the test runs to perform")
+    parser.add_argument("--inventory", help="CSV or YAML file listing devices to run every applicable test against")
+    parser.add_argument("--tests", help="comma separated test IDs to limit inventory runs to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of test runs to execute in parallel")
+    parser.add_argument("--per-device", type=int, default=1,
+                        help="number of test runs to execute in parallel against any one device")
+    parser.add_argument("--report", dest="report_file", help="file to write an aggregated JSON report to")
+    parser.add_argument("--json", dest="json_file", help="file to write JSON results to")
+    parser.add_argument("--junit", dest="junit_file", help="file to write JUnit XML results to")
+    parser.add_argument("--validator", choices=VALIDATION_BACKENDS,
+                        help="means of validating responses against schemas, for runs which don't specify one")
+    parser.add_argument("--record", metavar="DIR",
+                        help="directory to record the HTTP traffic of each run to, for runs which don't specify a file")
+    parser.add_argument("--replay", metavar="DIR",
+                        help="directory of recorded HTTP traffic to replay in place of the APIs under test, for runs "
+                             "which don't specify a file")
+    parser.add_argument("--skip-init", action="store_true",
+                        help="use the specification repositories in the cache without updating them")
+    args = parser.parse_args()
+
+    if bool(args.manifest) == bool(args.inventory):
+        parser.error("exactly one of a manifest or an inventory must be given")
+    if args.record and args.replay:
+        parser.error("traffic can't be both recorded and replayed")
+    if args.manifest:
+        runs = load_manifest(args.manifest)
+    else:
+        runs = load_inventory(args.inventory, args.tests.split(",") if args.tests else None)
+    if args.validator:
+        for run in runs:
+            run.setdefault("validator", args.validator)
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+        for run in runs:
+            if not run.get("replay"):
+                run.setdefault("record", os.path.join(args.record, archive_name(run)))
+    if args.replay:
+        for run in runs:
+            if not run.get("record"):
+                run.setdefault("replay", os.path.join(args.replay, archive_name(run)))
+
+    if not args.skip_init:
+        print(" * Initialising specification repositories...")
+        init_spec_repos()
+        print(" * Initialisation complete")
+    else:
+        build_spec_snapshots()
+    install_spec_bundle()
+
+    outputs = run_manifest(runs, args.workers, args.per_device)
+
+    if args.json_file:
+        with open(args.json_file, "w") as f:
+            json.dump(outputs, f, indent=2)
+    if args.junit_file:
+        write_junit(outputs, args.junit_file)
+    if args.report_file:
+        with open(args.report_file, "w") as f:
+            json.dump(build_report(outputs), f, indent=2)
+
+    failed = False
+    for output in outputs:
+        counts = {}
+        for result in output["result"]:
+            counts[result[1]] = counts.get(result[1], 0) + 1
+        if output["error"] or "Fail" in counts:
+            failed = True
+        summary = ", ".join(["{} {}".format(counts[status], status) for status in sorted(counts)])
+        print(" * {}: {}".format(run_name(output), output["error"] or summary))
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,42 @@
+# Copyright (C) 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+
+from Config import SPEC_BUNDLE_PATH
+from SpecRepos import init_spec_repos, build_spec_snapshots
+from SpecBundle import build_spec_bundle
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create a bundle of pre-parsed specifications for use on machines "
+                                                 "without git or network access")
+    parser.add_argument("--output", default=SPEC_BUNDLE_PATH, help="file to write the bundle to")
+    parser.add_argument("--skip-init", action="store_true",
+                        help="use the specification repositories in the cache without updating them")
+    args = parser.parse_args()
+
+    if not args.skip_init:
+        print(" * Initialising specification repositories...")
+        init_spec_repos()
+        print(" * Initialisation complete")
+    else:
+        build_spec_snapshots()
+
+    build_spec_bundle(args.output)
+    print(" * Specification bundle written to '{}'".format(args.output))
+
+
+if __name__ == '__main__':
+    main()
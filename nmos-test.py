@@ -14,111 +14,29 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from flask import Flask, render_template, flash, request
+from flask import Flask, render_template, flash, request, redirect, url_for, jsonify, abort, Response, \
+    stream_with_context
 from wtforms import Form, validators, StringField, SelectField, IntegerField, HiddenField, FormField, FieldList
-from Registry import REGISTRY, REGISTRY_API
-from Node import NODE, NODE_API
-from Config import CACHE_PATH, SPECIFICATIONS
-from datetime import datetime, timedelta
+from Config import SPECIFICATIONS, JOB_WORKERS, JOB_HISTORY, MOCK_SESSION_PORTS, VALIDATION_BACKEND, \
+    VALIDATION_BACKENDS
+from JobQueue import Job, JobQueue
+from TestSession import TestSessionPool
+from TestDefinitions import TEST_DEFINITIONS, build_apis, run_test
+from TestCatalogue import get_test_catalogue
+from SpecRepos import init_spec_repos, start_spec_refresher
+from SpecBundle import install_spec_bundle
 
-import git
-import os
 import json
 import copy
-import pickle
-
-import IS0401Test
-import IS0402Test
-import IS0501Test
-import IS0502Test
-import IS0601Test
-import IS0701Test
-import IS0801Test
+import os
 
 
 app = Flask(__name__)
 app.debug = True  # Ensures we can debug exceptions more easily
 app.config['SECRET_KEY'] = 'nmos-interop-testing-jtnm'
-app.config['TEST_ACTIVE'] = False
-app.register_blueprint(REGISTRY_API)  # Dependency for IS0401Test
-app.register_blueprint(NODE_API)  # Dependency for IS0401Test
-
-
-# Definitions of each set of tests made available from the dropdowns
-TEST_DEFINITIONS = {
-    "IS-04-01": {
-        "name": "IS-04 Node API",
-        "specs": [{
-            "spec_key": "is-04",
-            "api_key": "node"
-        }],
-        "class": IS0401Test.IS0401Test
-    },
-    "IS-04-02": {
-        "name": "IS-04 Registry APIs",
-        "specs": [{
-            "spec_key": "is-04",
-            "api_key": "registration"
-        }, {
-            "spec_key": "is-04",
-            "api_key": "query"
-        }],
-        "class": IS0402Test.IS0402Test
-    },
-    "IS-05-01": {
-        "name": "IS-05 Connection Management API",
-        "specs": [{
-            "spec_key": 'is-05',
-            "api_key": "connection"
-        }],
-        "class": IS0501Test.IS0501Test
-    },
-    "IS-05-02": {
-        "name": "IS-05 Interaction with Node API",
-        "specs": [{
-            "spec_key": "is-04",
-            "api_key": "node"
-        }, {
-            "spec_key": "is-05",
-            "api_key": "connection"
-        }],
-        "class": IS0502Test.IS0502Test
-    },
-    "IS-06-01": {
-        "name": "IS-06 Network Control API",
-        "specs": [{
-            "spec_key": 'is-06',
-            "api_key": "netctrl"
-        }],
-        "class": IS0601Test.IS0601Test
-    },
-    "IS-07-01": {
-        "name": "IS-07 Event & Tally API",
-        "specs": [{
-            "spec_key": 'is-07',
-            "api_key": "events"
-        }],
-        "class": IS0701Test.IS0701Test
-    },
-    "IS-08-01": {
-        "name": "IS-08 Channel Mapping API",
-        "specs": [{
-            "spec_key": 'is-08',
-            "api_key": "channelmapping"
-        }],
-        "class": IS0801Test.IS0801Test
-    }
-}
-
-
-def enumerate_tests(class_def):
-    tests = []
-    for method_name in dir(class_def):
-        if method_name.startswith("test_"):
-            method = getattr(class_def, method_name)
-            if callable(method):
-                tests.append(method_name)
-    return tests
+
+JOBS = JobQueue(JOB_WORKERS, JOB_HISTORY)
+SESSIONS = TestSessionPool(MOCK_SESSION_PORTS)  # Dependency for IS0401Test
 
 
 class NonValidatingSelectField(SelectField):
@@ -156,14 +74,21 @@ class DataForm(Form):
 
     # Define the secondary test selection dropdown
     test_selection = NonValidatingSelectField(label="Test Selection:", choices=[("all", "all"),
-                                                                                ("auto", "auto")])
+                                                                                ("auto", "auto"),
+                                                                                ("rerun", "rerun")])
+
+    # Define the schema validation dropdown
+    validation_backend = SelectField(label="Validator:", choices=[(x, x) for x in VALIDATION_BACKENDS],
+                                     default=VALIDATION_BACKEND)
 
     # Hide test data in the web form for dynamic modification of behaviour
+    test_catalogue = get_test_catalogue(TEST_DEFINITIONS)
     test_data = {}
     for test_id in TEST_DEFINITIONS:
         test_data[test_id] = copy.deepcopy(TEST_DEFINITIONS[test_id])
+        test_data[test_id].pop("module")
         test_data[test_id].pop("class")
-        test_data[test_id]["tests"] = ["all", "auto"] + enumerate_tests(TEST_DEFINITIONS[test_id]["class"])
+        test_data[test_id]["tests"] = ["all", "auto", "rerun"] + test_catalogue[test_id]
 
     hidden_options = HiddenField(default=max_endpoints)
     hidden_tests = HiddenField(default=json.dumps(test_data))
@@ -174,101 +99,107 @@ class DataForm(Form):
 @app.route('/', methods=["GET", "POST"])
 def index_page():
     form = DataForm(request.form)
-    if request.method == "POST" and not app.config['TEST_ACTIVE']:
+    if request.method == "POST":
         if form.validate():
             test = request.form["test"]
             if test in TEST_DEFINITIONS:
-                test_def = TEST_DEFINITIONS[test]
-                apis = {}
-                spec_count = 0
-                for spec in test_def["specs"]:
-                    ip = request.form["endpoints-{}-ip".format(spec_count)]
-                    port = request.form["endpoints-{}-port".format(spec_count)]
-                    version = request.form["endpoints-{}-version".format(spec_count)]
-                    base_url = "http://{}:{}".format(ip, str(port))
-
-                    spec_key = spec["spec_key"]
-                    api_key = spec["api_key"]
-                    apis[api_key] = {
-                        "raml": SPECIFICATIONS[spec_key]["apis"][api_key]["raml"],
-                        "base_url": base_url,
-                        "url": "{}/x-nmos/{}/{}/".format(base_url, api_key, version),
-                        "spec_path": CACHE_PATH + '/' + spec_key,
-                        "version": version,
-                        "spec": None  # Used inside GenericTest
-                    }
-
-                    spec_count += 1
+                endpoints = []
+                for spec_count in range(len(TEST_DEFINITIONS[test]["specs"])):
+                    endpoints.append({
+                        "ip": request.form["endpoints-{}-ip".format(spec_count)],
+                        "port": request.form["endpoints-{}-port".format(spec_count)],
+                        "version": request.form["endpoints-{}-version".format(spec_count)]
+                    })
+                apis = build_apis(test, endpoints)
+                base_url = "http://{}:{}".format(endpoints[-1]["ip"], str(endpoints[-1]["port"]))
 
                 test_selection = request.form["test_selection"]
+                validation_backend = request.form["validation_backend"]
+
+                def run_job(job):
+                    return run_test(test, apis, test_selection, SESSIONS, job, validation_backend)
 
-                # Instantiate the test class
-                test_obj = None
-                if test == "IS-04-01":
-                    # This test has an unusual constructor as it requires a registry instance
-                    test_obj = test_def["class"](apis, REGISTRY, NODE)
-                else:
-                    test_obj = test_def["class"](apis)
-
-                app.config['TEST_ACTIVE'] = True
-                try:
-                    result = test_obj.run_tests(test_selection)
-                except Exception as ex:
-                    print(" * ERROR: {}".format(ex))
-                    raise ex
-                finally:
-                    app.config['TEST_ACTIVE'] = False
-                return render_template("result.html", url=base_url, test=test, result=result)
+                job = JOBS.submit(test, run_job, base_url)
+                return redirect(url_for("job_page", job_id=job.id))
             else:
                 flash("Error: This test definition does not exist")
         else:
             flash("Error: {}".format(form.errors))
-    elif request.method == "POST":
-        flash("Error: A test is currently in progress. Please wait until it has completed or restart the testing tool.")
 
     return render_template("index.html", form=form)
 
 
+# Status or result of a queued test run
+@app.route('/jobs/<job_id>', methods=["GET"])
+def job_page(job_id):
+    job = JOBS.get(job_id)
+    if not job:
+        abort(404)
+    if job.status == Job.COMPLETE:
+        return render_template("result.html", url=job.url, test=job.test_id, result=job.result)
+    return render_template("job.html", job=job, position=JOBS.position(job_id))
+
+
+# Machine readable status and result of a queued test run, for polling clients
+@app.route('/api/jobs/<job_id>', methods=["GET"])
+def job_api(job_id):
+    job = JOBS.get(job_id)
+    if not job:
+        abort(404)
+    job_data = job.to_dict()
+    job_data["position"] = JOBS.position(job_id)
+    return jsonify(job_data)
+
+
+# Stop a queued or running test run. Tests which have not yet started are reported as N/A.
+@app.route('/api/jobs/<job_id>/abort', methods=["POST"])
+def job_abort(job_id):
+    job = JOBS.get(job_id)
+    if not job:
+        abort(404)
+    job.abort()
+    return jsonify({"id": job.id, "status": job.status})
+
+
+# Server-sent events carrying each test result as it is produced, followed by the final job status
+@app.route('/api/jobs/<job_id>/events', methods=["GET"])
+def job_events(job_id):
+    job = JOBS.get(job_id)
+    if not job:
+        abort(404)
+
+    def events():
+        sent = 0
+        status = None
+        while True:
+            job.wait(sent, timeout=15)
+            new_results = job.results[sent:]
+            for result in new_results:
+                sent += 1
+                data = {"result": result, "progress": sent, "expected": job.expected_results}
+                yield "event: result\ndata: {}\n\n".format(json.dumps(data))
+            if job.status != status:
+                status = job.status
+                yield "event: status\ndata: {}\n\n".format(json.dumps({"status": status, "error": job.error}))
+            if job.is_finished() and sent == len(job.results):
+                yield "event: done\ndata: {}\n\n"
+                return
+            if len(new_results) == 0:
+                yield ": keep-alive\n\n"
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream")
+
+
 if __name__ == '__main__':
-    print(" * Initialising specification repositories...")
-
-    if not os.path.exists(CACHE_PATH):
-        os.makedirs(CACHE_PATH)
-
-    # Prevent re-pulling of the spec repos too frequently
-    time_now = datetime.now()
-    last_pull_file = os.path.join(CACHE_PATH + "/last_pull")
-    last_pull_time = time_now - timedelta(hours=1)
-    update_last_pull = False
-    if os.path.exists(last_pull_file):
-        try:
-            with open(last_pull_file, "rb") as f:
-                last_pull_time = pickle.load(f)
-        except Exception as e:
-            print(" * ERROR: Unable to load last pull time for cache: {}".format(e))
-
-    for repo_key, repo_data in SPECIFICATIONS.items():
-        path = os.path.join(CACHE_PATH + '/' + repo_key)
-        if not os.path.exists(path):
-            print(" * Initialising repository '{}'".format(repo_data["repo"]))
-            repo = git.Repo.clone_from('https://github.com/AMWA-TV/' + repo_data["repo"] + '.git', path)
-            update_last_pull = True
-        else:
-            repo = git.Repo(path)
-            repo.git.reset('--hard')
-            # Only pull if we haven't in the last hour
-            if (last_pull_time + timedelta(hours=1)) <= time_now:
-                print(" * Pulling latest files for repository '{}'".format(repo_data["repo"]))
-                repo.remotes.origin.pull()
-                update_last_pull = True
-
-    if update_last_pull:
-        try:
-            with open(last_pull_file, "wb") as f:
-                pickle.dump(time_now, f)
-        except Exception as e:
-            print(" * ERROR: Unable to write last pull time to file: {}".format(e))
-
-    print(" * Initialisation complete")
+    # In debug mode the reloader re-runs this script in a child process which serves the requests, so the
+    # repositories are only initialised and refreshed there
+    if not app.debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        print(" * Initialising specification repositories...")
+
+        init_spec_repos()
+        install_spec_bundle()
+        start_spec_refresher()
+
+        print(" * Initialisation complete")
 
     app.run(host='0.0.0.0', threaded=True)
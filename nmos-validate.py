@@ -0,0 +1,193 @@
+# Copyright (C) 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+from Config import SPECIFICATIONS
+from SpecRepos import init_spec_repos, build_spec_snapshots, get_spec_snapshot
+from SpecBundle import install_spec_bundle
+from SchemaStore import get_schema_store
+from SchemaCompiler import CompiledValidator
+
+
+# Values substituted for each part of an example to produce instances which are likely to be invalid
+SAMPLE_VALUES = [None, True, False, 0, 1, -1, 1.5, "", "x", [], {}]
+
+# Limit on the number of variations of each valid example checked against a schema
+MAX_MUTATIONS = 1000
+
+
+def mutations(value):
+    """Generate variations of a JSON value, each differing from it in one place"""
+    for sample in SAMPLE_VALUES:
+        yield sample
+    if isinstance(value, dict):
+        yield dict(value, unexpected_property="x")
+        for key in value:
+            yield {k: v for k, v in value.items() if k != key}
+            for mutation in mutations(value[key]):
+                yield dict(value, **{key: mutation})
+    elif isinstance(value, list) and value:
+        yield value + value[:1]
+        for index, item in enumerate(value):
+            for mutation in mutations(item):
+                yield value[:index] + [mutation] + value[index + 1:]
+
+
+def load_examples(snapshot_path):
+    """Load every JSON file in a specification snapshot other than its schemas"""
+    examples = []
+    schema_path = os.path.join(snapshot_path, "APIs", "schemas")
+    for root, dirs, files in os.walk(snapshot_path):
+        if os.path.abspath(root) == os.path.abspath(schema_path):
+            continue
+        for file_name in sorted(files):
+            if file_name.endswith(".json"):
+                try:
+                    with open(os.path.join(root, file_name)) as f:
+                        examples.append(json.load(f))
+                except ValueError:
+                    pass
+    return examples
+
+
+def time_validator(validator, instances):
+    """Check each instance, returning the verdicts and the time taken"""
+    start = time.time()
+    verdicts = [validator.is_valid(instance) for instance in instances]
+    return verdicts, time.time() - start
+
+
+def check_snapshot(spec_key, version, snapshot_path):
+    """Compare the verdicts of the jsonschema and compiled validators for every schema in a snapshot, returning the
+    number of disagreements"""
+    store = get_schema_store(os.path.join(snapshot_path, "APIs", "schemas"))
+    examples = load_examples(snapshot_path)
+    counts = {"schemas": 0, "fallbacks": 0, "checks": 0, "mismatches": 0}
+    timings = {"jsonschema": 0, "compiled": 0}
+
+    for schema_name in sorted(store.load_all()):
+        schema_name = schema_name[len(store.base_uri):]
+        schema = store.load(schema_name)
+        reference = store.compile_validator(schema, backend="jsonschema")
+        compiled = store.compile_validator(schema, backend="compiled")
+        counts["schemas"] += 1
+        if not isinstance(compiled, CompiledValidator):
+            counts["fallbacks"] += 1
+            print(" * {} {}: {} is validated by jsonschema".format(spec_key, version, schema_name))
+            continue
+
+        # Examples which are valid are varied to explore the boundaries of the schema
+        instances = list(examples)
+        for example in examples:
+            if reference.is_valid(example):
+                instances += itertools.islice(mutations(example), MAX_MUTATIONS)
+
+        expected, reference_time = time_validator(reference, instances)
+        actual, compiled_time = time_validator(compiled, instances)
+        timings["jsonschema"] += reference_time
+        timings["compiled"] += compiled_time
+        counts["checks"] += len(instances)
+        for instance, expected_verdict, actual_verdict in zip(instances, expected, actual):
+            if expected_verdict != actual_verdict:
+                counts["mismatches"] += 1
+                print(" * ERROR: {} {}: {} gave {} for {} rather than {}".format(
+                    spec_key, version, schema_name, actual_verdict, json.dumps(instance)[:200], expected_verdict))
+
+    print(" * {} {}: {} schemas ({} not compiled), {} checks, {} mismatches, jsonschema {:.3f}s, compiled {:.3f}s"
+          .format(spec_key, version, counts["schemas"], counts["fallbacks"], counts["checks"], counts["mismatches"],
+                  timings["jsonschema"], timings["compiled"]))
+    return counts["mismatches"]
+
+
+def benchmark(spec_key, version, schema_name, instances_file, repeat):
+    """Time both validators against the contents of a file, such as a dump of a large registry, returning whether
+    their verdicts agree"""
+    commit, snapshot_path = get_spec_snapshot(spec_key, version)
+    store = get_schema_store(os.path.join(snapshot_path, "APIs", "schemas"))
+    schema = store.load(schema_name)
+    with open(instances_file) as f:
+        instance = json.load(f)
+
+    verdicts = {}
+    for backend in ["jsonschema", "compiled"]:
+        start = time.time()
+        validator = store.compile_validator(schema, backend=backend)
+        compile_time = time.time() - start
+        times = []
+        for _ in range(repeat):
+            verdict, run_time = time_validator(validator, [instance])
+            times.append(run_time)
+        verdicts[backend] = verdict[0]
+        print(" * {}: {} in {:.3f}s (best of {}), created in {:.3f}s".format(
+            backend, "valid" if verdict[0] else "invalid", min(times), repeat, compile_time))
+    return verdicts["jsonschema"] == verdicts["compiled"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that compiled schema validators give the same results as "
+                                                 "jsonschema for every schema in the specifications, and compare "
+                                                 "their speed")
+    parser.add_argument("--spec", help="specification key, such as 'is-04', to limit checks or benchmark to")
+    parser.add_argument("--version", help="API version, such as 'v1.2', to limit checks or benchmark to")
+    parser.add_argument("--schema", help="name of the schema file to benchmark against")
+    parser.add_argument("--instances", help="JSON file to validate against the schema when benchmarking")
+    parser.add_argument("--repeat", type=int, default=3, help="number of times to repeat each benchmark")
+    parser.add_argument("--skip-init", action="store_true",
+                        help="use the specification repositories in the cache without updating them")
+    args = parser.parse_args()
+
+    if bool(args.schema) != bool(args.instances) or (args.schema and not (args.spec and args.version)):
+        parser.error("benchmarks require --spec, --version, --schema and --instances")
+
+    if not args.skip_init:
+        print(" * Initialising specification repositories...")
+        init_spec_repos()
+        print(" * Initialisation complete")
+    else:
+        build_spec_snapshots()
+    install_spec_bundle()
+
+    if args.instances:
+        agree = benchmark(args.spec, args.version, args.schema, args.instances, args.repeat)
+        if not agree:
+            print(" * ERROR: Validators disagree")
+        sys.exit(0 if agree else 1)
+
+    mismatches = 0
+    checked = set()
+    for spec_key, spec_data in sorted(SPECIFICATIONS.items()):
+        if args.spec and spec_key != args.spec:
+            continue
+        for version in spec_data["versions"]:
+            if args.version and version != args.version:
+                continue
+            try:
+                commit, snapshot_path = get_spec_snapshot(spec_key, version)
+            except Exception as e:
+                print(" * ERROR: Unable to check '{}' {}: {}".format(spec_key, version, e))
+                continue
+            if (spec_key, commit) not in checked:
+                checked.add((spec_key, commit))
+                mismatches += check_snapshot(spec_key, version, snapshot_path)
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
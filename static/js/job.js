@@ -0,0 +1,65 @@
+var resultClasses = {
+    "Pass": "bg-success pass",
+    "Manual": "bg-info manual",
+    "N/A": "bg-secondary notavailable",
+    "Fail": "bg-danger fail"
+};
+
+function addResult(result) {
+    var row = document.createElement("tr");
+    var cells = [result[3], result[1], result[0], result[2], result[4]];
+    for (var i=0; i<cells.length; i++) {
+      var cell = document.createElement("td");
+      cell.textContent = cells[i];
+      if (i == 1) {
+        cell.className = resultClasses[result[1]] || resultClasses["Fail"];
+      }
+      row.appendChild(cell);
+    }
+    document.getElementById("job_results").appendChild(row);
+}
+
+function updateProgress(progress, expected) {
+    var bar = document.getElementById("job_progress");
+    if (expected) {
+      var percent = Math.min(100, Math.round(100 * progress / expected));
+      bar.style.width = percent.toString() + "%";
+      bar.textContent = progress.toString() + " / " + expected.toString();
+    }
+}
+
+document.addEventListener("DOMContentLoaded", function() {
+    var job = document.getElementById("job");
+    if (!job) {
+      return;
+    }
+
+    var source = new EventSource(job.dataset.events);
+    source.addEventListener("result", function(event) {
+      var data = JSON.parse(event.data);
+      addResult(data["result"]);
+      updateProgress(data["progress"], data["expected"]);
+    });
+    source.addEventListener("status", function(event) {
+      var data = JSON.parse(event.data);
+      if (data["status"] == "Running") {
+        document.getElementById("job_status").textContent = "Executing test..";
+      } else if (data["status"] == "Failed") {
+        document.getElementById("job_status").textContent = "Error: " + data["error"];
+        document.getElementById("job_status").className = "alert alert-warning";
+      }
+    });
+    source.addEventListener("done", function(event) {
+      source.close();
+      // Show the complete set of results in order
+      window.location.reload();
+    });
+
+    document.getElementById("abortbtn").onclick = function() {
+      var request = new XMLHttpRequest();
+      request.open("POST", job.dataset.abort);
+      request.send();
+      document.getElementById("abortbtn").value = "Aborting..";
+      document.getElementById("abortbtn").disabled = true;
+    };
+});
@@ -0,0 +1,98 @@
+# Copyright (C) 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import time
+import TestHelper
+import TestResult
+
+# Imported as a module, as pytest would collect the decorators as tests
+import GenericTest
+
+from TrafficArchive import TrafficArchive
+
+
+class SlowTest(GenericTest.GenericTest):
+    def __init__(self):
+        GenericTest.GenericTest.__init__(self, {})
+        self.events = []
+
+    @GenericTest.test_mutates("senders")
+    @GenericTest.test_timeout(1)
+    def test_01(self):
+        """Takes longer than its timeout"""
+        self.events.append("test_01 started")
+        time.sleep(2.5)
+        self.events.append("test_01 finished")
+        return TestResult.Test("Takes longer than its timeout", "test_01").PASS()
+
+    @GenericTest.test_mutates("senders")
+    def test_02(self):
+        """Changes the same resources"""
+        self.events.append("test_02 started")
+        return TestResult.Test("Changes the same resources", "test_02").PASS()
+
+    @GenericTest.test_read_only
+    def test_03(self):
+        """Reads any resources"""
+        self.events.append("test_03 started")
+        return TestResult.Test("Reads any resources", "test_03").PASS()
+
+    def execute_tests(self, test_name):
+        self.result += self.schedule_tests(["test_01", "test_02", "test_03"])
+
+    def tear_down_tests(self):
+        self.events.append("tear down")
+
+
+def test_abandoned_tests_hold_conflicts_and_tear_down():
+    test = SlowTest()
+    results = test.run_tests()
+
+    assert [result[1] for result in results[-4:-1]] == ["Fail", "Pass", "Pass"]
+    assert "within 1s" in results[-4][2]
+    assert test.events.index("test_01 finished") < test.events.index("test_02 started")
+    assert test.events.index("test_01 finished") < test.events.index("test_03 started")
+    assert test.events[-1] == "tear down"
+    assert test.incomplete_tests == {"test_01"}
+
+
+class MockSpecification(object):
+    def get_reads(self):
+        return []
+
+
+def test_unrecorded_basics_are_not_tested(tmp_path):
+    base_url = "http://127.0.0.1:9"
+    archive_file = str(tmp_path / "archive.jsonl")
+    with open(archive_file, "w") as f:
+        # Only the first of the two base path requests was recorded
+        f.write(json.dumps({
+            "time": 0, "method": "GET", "url": base_url + "/x-nmos", "request_headers": {}, "request_body": None,
+            "request_base64": False, "elapsed": 0.01, "error": None, "status": 200, "reason": "OK",
+            "headers": {"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"},
+            "body": json.dumps(["connection/"]), "base64": False, "final_url": base_url + "/x-nmos", "history": []
+        }) + "\n")
+
+    test = GenericTest.GenericTest({})
+    test.apis = {"connection": {"base_url": base_url, "version": "v1.0", "spec": MockSpecification()}}
+    with TrafficArchive(archive_file, replay=True) as archive:
+        TestHelper.attach_archive([base_url], archive)
+        try:
+            results = test.basics()
+        finally:
+            TestHelper.detach_archive([base_url])
+
+    assert [result[1] for result in results] == ["Pass", "N/A"]
+    assert "GET {}/x-nmos/connection".format(base_url) in results[1][2]
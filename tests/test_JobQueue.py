@@ -0,0 +1,139 @@
+# Copyright (C) 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from threading import Event
+from JobQueue import Job, JobQueue
+
+
+class MockTest(object):
+    """Stands in for a GenericTest which a job follows the results of"""
+    def __init__(self):
+        self.result_listener = None
+        self.aborted = Event()
+
+    def expected_result_count(self, test_selection):
+        return 3
+
+    def abort(self):
+        self.aborted.set()
+
+
+def blocking_target(started, release, order=None):
+    def target(job):
+        if order is not None:
+            order.append(job.test_id)
+        started.set()
+        assert release.wait(5)
+        return job.test_id
+    return target
+
+
+def test_runs_jobs_in_order():
+    queue = JobQueue(workers=1)
+    started, release = Event(), Event()
+    order = []
+    jobs = [queue.submit(str(index), blocking_target(started, release, order)) for index in range(3)]
+
+    assert started.wait(5)
+    assert jobs[0].status == Job.RUNNING
+    assert [queue.position(job.id) for job in jobs] == [None, 0, 1]
+
+    release.set()
+    for job in jobs:
+        while not job.is_finished():
+            job.wait(0, timeout=5)
+    assert order == ["0", "1", "2"]
+    assert [job.result for job in jobs] == ["0", "1", "2"]
+    assert all(job.status == Job.COMPLETE for job in jobs)
+
+
+def test_abort_before_start():
+    queue = JobQueue(workers=1)
+    started, release = Event(), Event()
+    first = queue.submit("first", blocking_target(started, release))
+    assert started.wait(5)
+
+    called = []
+    second = queue.submit("second", lambda job: called.append(job))
+    second.abort()
+    release.set()
+    while not second.is_finished():
+        second.wait(0, timeout=5)
+
+    assert first.status == Job.COMPLETE
+    assert second.status == Job.FAILED
+    assert second.error == "Test run was aborted before it started"
+    assert second.started is None
+    assert called == []
+
+
+def test_abort_while_running():
+    test_obj = MockTest()
+
+    def target(job):
+        job.attach(test_obj, "all")
+        test_obj.result_listener(["Test", "Pass", "", "test_01", "0s"])
+        assert test_obj.aborted.wait(5)
+        return "aborted"
+
+    queue = JobQueue(workers=1)
+    job = queue.submit("test", target)
+    job.wait(0, timeout=5)
+    assert len(job.results) == 1
+    assert job.expected_results == 3
+
+    job.abort()
+    while not job.is_finished():
+        job.wait(1, timeout=5)
+    assert job.status == Job.COMPLETE
+    assert job.result == "aborted"
+
+
+def test_attach_after_abort():
+    job = Job("test", None)
+    job.abort()
+    test_obj = MockTest()
+    job.attach(test_obj, "all")
+    assert test_obj.aborted.is_set()
+
+
+def test_failed_job():
+    def target(job):
+        raise Exception("Unable to connect")
+
+    job = Job("test", target)
+    job.run()
+    assert job.status == Job.FAILED
+    assert job.error == "Unable to connect"
+    assert job.finished is not None
+
+
+def test_prunes_oldest_finished_jobs():
+    queue = JobQueue(workers=1, history=2)
+    finished = [queue.submit(str(index), lambda job: None) for index in range(2)]
+    for job in finished:
+        while not job.is_finished():
+            job.wait(0, timeout=5)
+
+    started, release = Event(), Event()
+    running = queue.submit("running", blocking_target(started, release))
+    assert started.wait(5)
+    pending = queue.submit("pending", lambda job: None)
+
+    # Only finished jobs are discarded, so the history may be exceeded while jobs are queued
+    assert queue.get(finished[0].id) is None
+    assert queue.get(finished[1].id) is None
+    assert queue.get(running.id) is running
+    assert queue.get(pending.id) is pending
+    release.set()
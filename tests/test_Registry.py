@@ -0,0 +1,39 @@
+# Copyright (C) 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from Registry import Registry
+
+
+def test_accepts_any_node_unless_restricted():
+    registry = Registry()
+    assert not registry.accepts("192.0.2.1")
+    registry.enable()
+    assert registry.accepts("192.0.2.1")
+    registry.disable()
+    assert not registry.accepts("192.0.2.1")
+
+
+def test_accepts_node_by_address():
+    registry = Registry()
+    registry.enable("192.0.2.1")
+    assert registry.accepts("192.0.2.1")
+    assert registry.accepts("::ffff:192.0.2.1")
+    assert not registry.accepts("192.0.2.2")
+
+
+def test_accepts_node_by_hostname():
+    registry = Registry()
+    registry.enable("localhost")
+    assert registry.accepts("127.0.0.1")
+    assert not registry.accepts("192.0.2.1")
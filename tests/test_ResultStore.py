@@ -0,0 +1,107 @@
+# Copyright (C) 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+import TestDefinitions
+import TestResult
+
+from GenericTest import GenericTest
+from ResultStore import ResultStore
+from TestResult import PREVIOUS_RESULT_NOTE
+
+
+APIS = {"node": {"base_url": "http://192.0.2.1:80", "version": "v1.2", "spec_commit": "abc"}}
+
+
+def result(name, status="Pass", description=None):
+    return [description or name, status, "", name, "0.001s"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultStore(str(tmp_path / "results.db"))
+
+
+def test_load_returns_saved_results_in_order(store):
+    store.save("IS-04-01", APIS, [result("__init__"), result("test_02"), result("test_01", "Fail")])
+    assert store.load("IS-04-01", APIS) == [result("test_02"), result("test_01", "Fail")]
+
+    # Results are specific to the endpoint, version and specification commit
+    other_commit = {"node": dict(APIS["node"], spec_commit="def")}
+    assert store.load("IS-04-01", other_commit) == []
+    assert store.load("IS-04-02", APIS) == []
+
+
+def test_save_replaces_previous_results(store):
+    store.save("IS-04-01", APIS, [result("test_01", "Fail"), result("test_02")])
+    store.save("IS-04-01", APIS, [result("test_01")])
+    assert store.load("IS-04-01", APIS) == [result("test_02"), result("test_01")]
+
+
+def test_save_replaces_all_automatic_results(store):
+    store.save("IS-04-01", APIS, [result("auto_1", "Fail", "GET /x-nmos/node/v1.2/senders/1"), result("test_01")])
+    store.save("IS-04-01", APIS, [result("auto_1", description="GET /x-nmos/node/v1.2/senders/2")])
+    assert store.load("IS-04-01", APIS) == [result("test_01"),
+                                            result("auto_1", description="GET /x-nmos/node/v1.2/senders/2")]
+
+
+def test_save_discards_incomplete_results(store):
+    store.save("IS-04-01", APIS, [result("auto_1"), result("test_01"), result("test_02")])
+    store.save("IS-04-01", APIS, [result("test_02", "N/A")], incomplete={"test_02"})
+    assert store.load("IS-04-01", APIS) == [result("auto_1"), result("test_01")]
+
+    # Automatic tests are run together, so are all run again if any didn't complete
+    store.save("IS-04-01", APIS, [result("auto_1")], incomplete={"auto_2"})
+    assert store.load("IS-04-01", APIS) == [result("test_01")]
+
+
+class AbortingTest(GenericTest):
+    """Passes test_01, fails test_02 and aborts the run during test_02 the first time it is executed"""
+    calls = []
+
+    def __init__(self):
+        GenericTest.__init__(self, {})
+
+    def test_01(self):
+        """First test"""
+        self.calls.append("test_01")
+        return TestResult.Test("First test").PASS()
+
+    def test_02(self):
+        """Second test"""
+        self.calls.append("test_02")
+        if self.calls.count("test_02") == 1:
+            self.abort()
+        return TestResult.Test("Second test").FAIL("Failed")
+
+    def test_03(self):
+        """Third test"""
+        self.calls.append("test_03")
+        return TestResult.Test("Third test").PASS()
+
+
+def test_rerun_repeats_failed_and_aborted_tests(tmp_path, monkeypatch):
+    monkeypatch.setattr(TestDefinitions, "RESULT_STORE_PATH", str(tmp_path / "results.db"))
+    AbortingTest.calls = []
+
+    first = TestDefinitions.execute_test(AbortingTest(), "IS-04-01", APIS, "all", None)
+    assert [(x[3], x[1]) for x in first[2:5]] == [("test_01", "Pass"), ("test_02", "Fail"), ("test_03", "N/A")]
+    assert AbortingTest.calls == ["test_01", "test_02"]
+
+    second = TestDefinitions.execute_test(AbortingTest(), "IS-04-01", APIS, "rerun", None)
+    assert AbortingTest.calls == ["test_01", "test_02", "test_02", "test_03"]
+    results = {x[3]: x for x in second}
+    assert results["test_01"][2].startswith(PREVIOUS_RESULT_NOTE)
+    assert results["test_02"][1] == "Fail"
+    assert results["test_03"][1] == "Pass" and not results["test_03"][2].startswith(PREVIOUS_RESULT_NOTE)
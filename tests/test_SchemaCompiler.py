@@ -0,0 +1,142 @@
+# Copyright (C) 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from jsonschema import Draft4Validator, RefResolver
+from SchemaCompiler import UnsupportedSchema, compile_schema
+
+
+BASE_URI = "file:/schemas/"
+
+# Other schema files which the schemas below refer to, in the style of the NMOS specifications
+DOCUMENTS = {
+    BASE_URI + "resource_core.json": {
+        "$schema": "http://json-schema.org/draft-04/schema#",
+        "type": "object",
+        "required": ["id", "version", "label"],
+        "properties": {
+            "id": {"type": "string", "pattern": "^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$"},
+            "version": {"type": "string", "pattern": "^[0-9]+:[0-9]+$"},
+            "label": {"type": "string"},
+            "tags": {"type": "object", "patternProperties": {"": {"type": "array", "items": {"type": "string"}}}}
+        }
+    },
+    BASE_URI + "definitions.json": {
+        "definitions": {
+            "rational": {
+                "type": "object",
+                "required": ["numerator"],
+                "properties": {"numerator": {"type": "integer"}, "denominator": {"type": "integer", "minimum": 1}},
+                "additionalProperties": False
+            },
+            "a/b~c": {"enum": ["x", 1, None]}
+        }
+    }
+}
+
+SCHEMAS = [
+    {"type": "string"},
+    {"type": ["integer", "null"]},
+    {"type": "number"},
+    {"type": "boolean"},
+    {"enum": [1, "1", True, None, [1], {"a": 1}]},
+    {"minimum": 0, "maximum": 10, "exclusiveMaximum": True},
+    {"minimum": 0, "exclusiveMinimum": True, "multipleOf": 0.5},
+    {"type": "integer", "multipleOf": 3},
+    {"minLength": 2, "maxLength": 3, "pattern": "^[a-z]+$"},
+    {"pattern": "b"},
+    {"minItems": 1, "maxItems": 3, "uniqueItems": True},
+    {"type": "array", "items": {"type": "integer"}},
+    {"items": [{"type": "string"}, {"type": "integer"}], "additionalItems": False},
+    {"items": [{"type": "string"}], "additionalItems": {"type": "boolean"}},
+    {"required": ["a"], "minProperties": 1, "maxProperties": 2},
+    {"properties": {"a": {"type": "string"}}, "additionalProperties": False},
+    {"properties": {"a": {}}, "patternProperties": {"^x-": {"type": "integer"}}, "additionalProperties": False},
+    {"additionalProperties": {"type": "integer"}},
+    {"dependencies": {"a": ["b"], "c": {"required": ["d"]}}},
+    {"allOf": [{"type": "integer"}, {"minimum": 2}]},
+    {"anyOf": [{"type": "string"}, {"type": "integer", "minimum": 5}]},
+    {"oneOf": [{"type": "integer"}, {"minimum": 2}]},
+    {"not": {"type": "string"}},
+    {"type": ["object", "array"], "required": ["a"], "minItems": 1},
+    {"type": "string", "minimum": 2, "required": ["a"]},
+    {"$ref": "resource_core.json"},
+    {"allOf": [{"$ref": "resource_core.json"}, {"properties": {"format": {"enum": ["urn:x-nmos:format:video"]}}}]},
+    {"properties": {"rate": {"$ref": "definitions.json#/definitions/rational"}}},
+    {"$ref": "definitions.json#/definitions/a~1b~0c"},
+    {"definitions": {"node": {"type": "object", "properties": {"child": {"$ref": "#/definitions/node"},
+                                                               "value": {"type": "integer"}}}},
+     "$ref": "#/definitions/node"},
+    {"id": "http://example.com/root.json", "definitions": {"a": {"type": "integer"}},
+     "properties": {"a": {"$ref": "#/definitions/a"}}},
+    {"$ref": "http://json-schema.org/draft-04/schema#"}
+]
+
+INSTANCES = [
+    None, True, False, 0, 1, 1.0, 1.5, 2, 3, 5, 6, 9.5, 10, -1, "", "a", "ab", "abc", "abcd", "AB", "1", "x",
+    [], [1], [1, 1], [1, True], ["a", 1], ["a", True, False], ["a", 1, 2], [1, 2, 3, 4], [{"a": 1}, {"a": 1}],
+    {}, {"a": 1}, {"a": "x"}, {"a": "x", "b": 1}, {"a": 1, "b": 2, "c": 3}, {"c": 1, "d": 2}, {"c": 1},
+    {"x-y": 1}, {"x-y": "1"}, {"b": True},
+    {"id": "0a1b2c3d-0000-1111-2222-333344445555", "version": "1:2", "label": "x", "tags": {"a": ["b"]}},
+    {"id": "0a1b2c3d-0000-1111-2222-333344445555", "version": "1:2", "label": "x", "tags": {"a": [1]}},
+    {"id": "not a uuid", "version": "1:2", "label": "x"},
+    {"id": "0a1b2c3d-0000-1111-2222-333344445555", "version": "1:2", "label": "x",
+     "format": "urn:x-nmos:format:audio"},
+    {"rate": {"numerator": 25}}, {"rate": {"numerator": 25, "denominator": 0}}, {"rate": {"numerator": 25.0}},
+    {"rate": {"numerator": 25, "extra": 1}}, {"child": {"child": {"value": 1}}}, {"child": {"child": {"value": "1"}}},
+    {"type": "string"}, {"type": "strings"}, {"minimum": "1"}
+]
+
+
+def validators(schema):
+    documents = dict(DOCUMENTS)
+    if "id" in schema:
+        # jsonschema resolves references within a schema with an id against that URI
+        documents[schema["id"]] = schema
+    resolver = RefResolver(BASE_URI, schema, store=documents)
+    return compile_schema(schema, BASE_URI, documents), Draft4Validator(schema, resolver=resolver)
+
+
+@pytest.mark.parametrize("schema", SCHEMAS)
+def test_matches_jsonschema(schema):
+    compiled, interpreted = validators(schema)
+    for instance in INSTANCES:
+        errors = [(list(error.path), error.message) for error in interpreted.iter_errors(instance)]
+        compiled_errors = [(list(error.path), error.message) for error in compiled.iter_errors(instance)]
+        assert compiled.is_valid(instance) == (len(errors) == 0), (instance, errors)
+        # Only the first error is found, which must be one of those jsonschema reports
+        assert len(compiled_errors) == min(len(errors), 1)
+        for error in compiled_errors:
+            assert error in errors, (instance, errors)
+
+
+def test_reports_location_of_errors():
+    compiled, _ = validators({"properties": {"rate": {"$ref": "definitions.json#/definitions/rational"}}})
+    error = next(compiled.iter_errors({"rate": {"numerator": 25, "denominator": 0}}))
+    assert list(error.path) == ["rate", "denominator"]
+    assert str(error) == "['rate']['denominator']: 0 is less than the minimum of 1"
+
+
+@pytest.mark.parametrize("schema", [
+    [],
+    {"$schema": "http://json-schema.org/draft-07/schema#"},
+    {"$ref": "missing.json"},
+    {"$ref": "definitions.json#/definitions/missing"},
+    {"type": "any"},
+    {"pattern": "("}
+])
+def test_rejects_unsupported_schemas(schema):
+    with pytest.raises(UnsupportedSchema):
+        compile_schema(schema, BASE_URI, dict(DOCUMENTS))
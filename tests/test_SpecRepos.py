@@ -0,0 +1,50 @@
+# Copyright (C) 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import SchemaStore
+import SpecCache
+import SpecRepos
+
+from types import SimpleNamespace
+
+
+def test_removed_snapshots_are_forgotten(tmp_path, monkeypatch):
+    monkeypatch.setattr(SpecRepos, "prune_spec_cache", lambda repo_key, commits: None)
+    monkeypatch.setattr(SpecRepos, "SPEC_SNAPSHOT_RETENTION", 0)
+    schema_dir = tmp_path / "old" / "APIs" / "schemas"
+    schema_dir.mkdir(parents=True)
+    (tmp_path / "kept" / "APIs").mkdir(parents=True)
+    (tmp_path / "retired.json").write_text(json.dumps({"old": 0, "kept": 0}))
+
+    raml = str(tmp_path / "old" / "APIs" / "NodeAPI.raml")
+    kept_raml = str(tmp_path / "kept" / "APIs" / "NodeAPI.raml")
+    SpecCache.SPEC_CACHE[(raml, "old")] = object()
+    SpecCache.SPEC_CACHE[(kept_raml, "kept")] = object()
+    SchemaStore.get_schema_store(str(schema_dir))
+
+    # The repository's only branch now refers to the kept snapshot
+    ref = SimpleNamespace(remote_head="v1.2.x", commit=SimpleNamespace(hexsha="kept"))
+    repo = SimpleNamespace(remotes=SimpleNamespace(origin=SimpleNamespace(refs=[ref])))
+    try:
+        SpecRepos._update_repo_snapshots(repo, "is-04", str(tmp_path), False)
+
+        assert not os.path.exists(str(tmp_path / "old"))
+        assert json.loads((tmp_path / "manifest.json").read_text()) == {"v1.2.x": "kept"}
+        assert (raml, "old") not in SpecCache.SPEC_CACHE
+        assert (kept_raml, "kept") in SpecCache.SPEC_CACHE
+        assert os.path.abspath(str(schema_dir)) not in SchemaStore._stores
+    finally:
+        SpecCache.SPEC_CACHE.pop((kept_raml, "kept"), None)
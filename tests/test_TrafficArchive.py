@@ -0,0 +1,137 @@
+# Copyright (C) 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import pytest
+import requests
+import TestHelper
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from TrafficArchive import TrafficArchive, clear_replay_misses, get_replay_misses
+
+
+class MockDevice(BaseHTTPRequestHandler):
+    """Serves /x-nmos as a redirect to /x-nmos/, echoes PATCH bodies and returns 404 for anything else"""
+    def _reply(self, status, body=None, headers=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/x-nmos":
+            self._reply(301, headers={"Location": "/x-nmos/"})
+        elif self.path == "/x-nmos/":
+            self._reply(200, ["connection/"])
+        else:
+            self._reply(404, {"code": 404})
+
+    def do_PATCH(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self._reply(200, json.loads(body.decode("utf-8")))
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def device():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockDevice)
+    Thread(target=server.serve_forever, daemon=True).start()
+    yield "http://127.0.0.1:{}".format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+def record(path, url, actions):
+    with TrafficArchive(path) as archive:
+        TestHelper.attach_archive([url], archive)
+        try:
+            return actions()
+        finally:
+            TestHelper.detach_archive([url])
+
+
+def replay(path, url, actions):
+    with TrafficArchive(path, replay=True) as archive:
+        TestHelper.attach_archive([url], archive)
+        try:
+            return actions()
+        finally:
+            TestHelper.detach_archive([url])
+
+
+def test_replays_responses_without_the_device(device, tmp_path):
+    path = str(tmp_path / "traffic.jsonl")
+
+    def actions():
+        status, missing = TestHelper.do_request("GET", device + "/missing")
+        patched = TestHelper.request("PATCH", device + "/staged", json={"master_enable": True})
+        return missing.status_code, missing.json(), patched.status_code, patched.json()
+
+    recorded = record(path, device, actions)
+    assert recorded == (404, {"code": 404}, 200, {"master_enable": True})
+    requests.get(device + "/x-nmos")  # Not recorded, as no archive is attached
+    with open(path) as f:
+        assert len(f.readlines()) == 2
+
+    assert replay(path, device, actions) == recorded
+
+
+def test_replays_redirects(device, tmp_path):
+    path = str(tmp_path / "traffic.jsonl")
+
+    def actions():
+        status, response = TestHelper.do_request("GET", device + "/x-nmos")
+        assert status
+        return (response.status_code, response.json(), response.url,
+                [(redirect.status_code, redirect.headers["Location"]) for redirect in response.history])
+
+    recorded = record(path, device, actions)
+    assert recorded == (200, ["connection/"], device + "/x-nmos/", [(301, "/x-nmos/")])
+    with open(path) as f:
+        entry = json.loads(f.readline())
+    assert entry["url"] == device + "/x-nmos"
+
+    assert replay(path, device, actions) == recorded
+
+
+def test_replays_errors(tmp_path):
+    path = str(tmp_path / "traffic.jsonl")
+    # Nothing listens on port 9 of the loopback interface
+    url = "http://127.0.0.1:9"
+
+    recorded = record(path, url, lambda: TestHelper.do_request("GET", url + "/x-nmos", timeout=1))
+    assert not recorded[0]
+
+    assert replay(path, url, lambda: TestHelper.do_request("GET", url + "/x-nmos")) == recorded
+
+
+def test_reports_requests_which_were_not_recorded(device, tmp_path):
+    path = str(tmp_path / "traffic.jsonl")
+    record(path, device, lambda: TestHelper.request("PATCH", device + "/staged", json={"port": 5004}))
+
+    def actions():
+        clear_replay_misses()
+        status, response = TestHelper.do_request("PATCH", device + "/staged", {"port": 5006})
+        return status, list(get_replay_misses())
+
+    status, misses = replay(path, device, actions)
+    assert not status
+    assert misses == ["PATCH {}/staged".format(device)]
@@ -0,0 +1,110 @@
+# Copyright (C) 2018 British Broadcasting Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import jsonschema
+import pytest
+import requests
+
+from GenericTest import GenericTest
+from TestHelper import NotAnArray, iter_json_array
+
+
+class MockResponse(object):
+    """A streamed response whose body is split into the given chunks, optionally failing once they're exhausted"""
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+        self.headers = {"Access-Control-Allow-Origin": "*"}
+
+    def iter_content(self, chunk_size):
+        for chunk in self.chunks:
+            yield chunk
+        if self.error:
+            raise self.error
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+DOCUMENTS = [
+    [],
+    [1.5e3, -2, 0, 10, "x", None, True, False],
+    [{"id": "a", "label": "café ☃", "tags": {"x": [1, 2]}}, {"id": "b"}],
+    [[], {}, "", [[1]], "a,b]c"],
+]
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+@pytest.mark.parametrize("indent", [None, 2])
+def test_parses_every_split_of_a_document(document, indent):
+    data = json.dumps(document, indent=indent, ensure_ascii=False).encode("utf-8")
+    for size in range(1, len(data) + 1):
+        assert list(iter_json_array(MockResponse(split(data, size)))) == document
+
+
+def test_numbers_split_between_chunks():
+    assert list(iter_json_array(MockResponse([b"[1", b"2.", b"5e", b"3, 4", b"]"]))) == [12.5e3, 4]
+
+
+def test_elements_are_yielded_as_they_are_read():
+    elements = iter_json_array(MockResponse([b'[{"id": 1}, ', b'{"id": 2}, '], error=RuntimeError("Too soon")))
+    assert next(elements) == {"id": 1}
+    assert next(elements) == {"id": 2}
+    with pytest.raises(RuntimeError):
+        next(elements)
+
+
+@pytest.mark.parametrize("data", [b'{"a": 1}', b'"x"', b' 1'])
+def test_rejects_other_values(data):
+    with pytest.raises(NotAnArray):
+        list(iter_json_array(MockResponse([data])))
+
+
+@pytest.mark.parametrize("data", [b'[1 2]', b'[1,]', b'[1] 2', b'[1', b'[{"a": }]', b'', b' '])
+def test_rejects_invalid_json(data):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(MockResponse(split(data, 2))))
+
+
+def test_rejects_invalid_utf8():
+    with pytest.raises(UnicodeDecodeError):
+        list(iter_json_array(MockResponse([b'["\xff"]'])))
+
+
+def checked_response(tmp_path, response):
+    test = GenericTest({})
+    test.apis = {"api": {"spec_path": str(tmp_path)}}
+    test.get_validator = lambda api_name, schema: jsonschema.Draft4Validator(schema)
+    return test.check_response_stream("api", {"type": "object"}, "GET", response)
+
+
+@pytest.mark.parametrize("chunks,message", [
+    ([b'{"id": 1}'], "Response schema validation error: response is not an array"),
+    ([b'[{"id": 1}, {'], "Invalid JSON received"),
+    ([b'[{"id": "\xff"}]'], "Invalid JSON received")
+])
+def test_invalid_responses_fail(tmp_path, chunks, message):
+    valid, response_message, subresources = checked_response(tmp_path, MockResponse(chunks))
+    assert not valid
+    assert response_message == message
+
+
+def test_read_errors_fail_the_response(tmp_path):
+    response = MockResponse([b'[{"id": 1}, '], error=requests.exceptions.ChunkedEncodingError("Connection broken"))
+    valid, message, subresources = checked_response(tmp_path, response)
+    assert not valid
+    assert "Connection broken" in message
+    assert subresources == [1]